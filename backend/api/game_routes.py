@@ -1,20 +1,38 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Header, Query
+import os
+import json
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from backend.core.game_logic import GameSession, validate_beats
+from backend.core.game_logic import GameSession, validate_beats, validate_beats_batch
 from backend.core.ai_client import get_ai_response
-from backend.core.moderation import check_content
-from backend.db.models import update_global_counter, get_global_counter, create_game_session, get_game_session
+from backend.core.cache import check_rate_limit, get_rate_limit_rule
+from backend.core.canonical import canonicalize
+from backend.core.leaderboard import leaderboard, LEADERBOARD_BUCKET_SECONDS, LEADERBOARD_BUCKETS_KEPT
+from backend.core.moderation import check_guess
+from backend.core.metrics import timed
+from backend.core.prefetch import prefetcher
+from backend.db.models import update_global_counter, get_global_counter, session_store
 
 router = APIRouter(prefix="/api", tags=["game"])
 
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "100"))  # Guesses per history page by default
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "1000"))  # Largest page a client may ask for
+VERDICT_BATCH_MAX_PAIRS = int(os.getenv("VERDICT_BATCH_MAX_PAIRS", "500"))  # Largest /verdicts/batch request
+
 class GuessRequest(BaseModel):
     guess: str
     session_id: str
 
+class VerdictPair(BaseModel):
+    guess: str
+    word: str
+
+class VerdictBatchRequest(BaseModel):
+    pairs: List[VerdictPair]
+
 class GuessResponse(BaseModel):
     valid: bool
     message: str
@@ -23,6 +41,21 @@ class GuessResponse(BaseModel):
     previous_guesses: List[str]
     global_count: int
 
+def rejected_message(guess: str, current_word: str, result: Dict[str, Any]) -> str:
+    if result.get("error"):
+        # The judge failed, so this isn't a real verdict
+        return "⚠️ The judge is unavailable right now, please try again."
+    return f"❌ Sorry, \"{guess}\" doesn't beat \"{current_word}\"."
+
+def game_over_message(guess: str) -> str:
+    return f"🎮 Game Over! \"{guess}\" was already guessed."
+
+def finished_message() -> str:
+    return "🎮 Game Over! This game has finished, start a new one to keep playing."
+
+def accepted_message(guess: str, current_word: str, global_count: int) -> str:
+    return f"✅ Nice! \"{guess}\" beats \"{current_word}\". {guess} has been guessed {global_count} times before."
+
 @router.post("/guess")
 async def make_guess(
     guess_request: GuessRequest,
@@ -31,12 +64,18 @@ async def make_guess(
     guess = guess_request.guess.strip().lower()
     session_id = guess_request.session_id
     
-    # Check for profanity
-    if check_content(guess):
+    # Check for profanity, as typed and in the canonical form it is played as
+    with timed("moderation"):
+        blocked = check_guess(guess)
+    if blocked:
         raise HTTPException(status_code=400, detail="Inappropriate content detected")
     
+    # One form of the guess for the verdict cache, the duplicate check and the counters
+    guess = canonicalize(guess)
+    
     # Get game session
-    game_session = await get_game_session(session_id)
+    with timed("session_load"):
+        game_session = await session_store.get(session_id)
     
     if not game_session:
         raise HTTPException(status_code=404, detail="Game session not found")
@@ -44,62 +83,146 @@ async def make_guess(
     # Get current word (the last guess or the seed)
     current_word = game_session["current_word"]
     
-    # Check if the guess beats the current word
-    result = await validate_beats(guess, current_word, persona)
-    
-    if not result["valid"]:
-        message = f"❌ Sorry, \"{guess}\" doesn't beat \"{current_word}\"."
+    # A finished game takes no more guesses, so don't spend an AI call on one
+    if game_session.get("status") == "finished":
         return {
             "valid": False,
-            "message": message,
+            "message": finished_message(),
             "current_word": current_word,
             "score": game_session["score"],
-            "previous_guesses": game_session["guesses"][-5:] if "guesses" in game_session else [],
+            "previous_guesses": game_session["guesses"][-5:],
             "global_count": 0
         }
     
-    # Check if the guess is already in the linked list
-    if guess in game_session["guesses"]:
+    # Check if the guess beats the current word
+    with timed("verdict"):
+        result = await validate_beats(guess, current_word, persona)
+    
+    if not result["valid"]:
         return {
             "valid": False,
-            "message": f"🎮 Game Over! \"{guess}\" was already guessed.",
+            "message": rejected_message(guess, current_word, result),
             "current_word": current_word,
             "score": game_session["score"],
-            "previous_guesses": game_session["guesses"][-5:],
-            "global_count": await get_global_counter(guess)
+            "previous_guesses": game_session["guesses"][-5:] if "guesses" in game_session else [],
+            "global_count": 0
         }
     
-    # Update global counter
-    global_count = await update_global_counter(guess)
+    # Append to the linked list in one atomic update, rejecting guesses already in it
+    with timed("session_append"):
+        updated_session = await session_store.append_guess(session_id, guess, current_word)
     
-    # Update game session
-    game_session["guesses"].append(guess)
-    game_session["current_word"] = guess
-    game_session["score"] += 1
+    if not updated_session:
+        # If the chain didn't move, the guess was rejected as a duplicate: finish the game
+        with timed("session_finish"):
+            finished_session = await session_store.finish(session_id, guess, current_word)
+        if finished_session:
+            return {
+                "valid": False,
+                "message": game_over_message(guess),
+                "current_word": current_word,
+                "score": finished_session["score"],
+                "previous_guesses": finished_session["guesses"][-5:],
+                "global_count": await get_global_counter(guess)
+            }
+        
+        latest_session = await session_store.get(session_id)
+        
+        # The game expired or was archived while we were validating
+        if not latest_session:
+            raise HTTPException(status_code=404, detail="Game session not found")
+        
+        # Another request finished the game while we were validating
+        if latest_session["status"] == "finished":
+            return {
+                "valid": False,
+                "message": finished_message(),
+                "current_word": latest_session["current_word"],
+                "score": latest_session["score"],
+                "previous_guesses": latest_session["guesses"][-5:],
+                "global_count": 0
+            }
+        
+        # Another request (e.g. a double submit) moved the chain on while we were validating
+        return {
+            "valid": False,
+            "message": f"⚠️ \"{current_word}\" is no longer the current word, try again.",
+            "current_word": latest_session["current_word"],
+            "score": latest_session["score"],
+            "previous_guesses": latest_session["guesses"][-5:],
+            "global_count": 0
+        }
     
-    await create_game_session(session_id, game_session)
+    # Warm verdicts for the player's likely next guesses in the background
+    prefetcher.after_accept(current_word, guess)
     
-    message = f"✅ Nice! \"{guess}\" beats \"{current_word}\". {guess} has been guessed {global_count} times before."
+    # Update global counter
+    with timed("global_counter"):
+        global_count = await update_global_counter(guess)
     
     return {
         "valid": True,
-        "message": message,
+        "message": accepted_message(guess, current_word, global_count),
         "current_word": guess,
-        "score": game_session["score"],
-        "previous_guesses": game_session["guesses"][-5:],
+        "score": updated_session["score"],
+        "previous_guesses": updated_session["guesses"],
         "global_count": global_count
     }
 
+@router.post("/verdicts/batch")
+async def verdicts_batch(
+    batch: VerdictBatchRequest,
+    request: Request,
+    persona: Optional[str] = Header("serious")
+):
+    if len(batch.pairs) > VERDICT_BATCH_MAX_PAIRS:
+        raise HTTPException(status_code=413, detail=f"At most {VERDICT_BATCH_MAX_PAIRS} pairs per batch")
+    
+    # Each pair can cost an AI call: the middleware counted the request as one, charge the rest
+    rule = get_rate_limit_rule(request.url.path)
+    if rule is not None and len(batch.pairs) > 1:
+        prefix, limit, window = rule
+        client_ip = request.client.host if request.client else "unknown"
+        redis_client = getattr(request.app.state, "redis", None)
+        if not await check_rate_limit(redis_client, client_ip, limit, window, scope=prefix, cost=len(batch.pairs) - 1):
+            raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": str(window)})
+    
+    # One JSON object per line, in input order, written as each verdict is ready
+    async def lines():
+        async for result in validate_beats_batch([(pair.guess, pair.word) for pair in batch.pairs], persona):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/leaderboard")
+async def get_leaderboard(
+    window: str = Query("all", pattern="^(all|trending)$"),
+    buckets_ago: int = Query(0, ge=0, lt=LEADERBOARD_BUCKETS_KEPT),
+    limit: int = Query(10, ge=1, le=100)
+):
+    # "trending" is one LEADERBOARD_BUCKET_SECONDS window: the current one, or `buckets_ago` before it
+    if window == "all":
+        return {"window": "all", "words": await leaderboard.top("all", limit)}
+    
+    bucket = leaderboard.bucket(buckets_ago)
+    return {
+        "window": "trending",
+        "since": bucket * LEADERBOARD_BUCKET_SECONDS,
+        "until": (bucket + 1) * LEADERBOARD_BUCKET_SECONDS,
+        "words": await leaderboard.top(str(bucket), limit)
+    }
+
 @router.post("/new-game")
 async def new_game(seed_word: str = "rock"):
     seed_word = seed_word.strip().lower()
     
     # Check for profanity in seed word
-    if check_content(seed_word):
+    if check_guess(seed_word):
         raise HTTPException(status_code=400, detail="Inappropriate content detected in seed word")
+    seed_word = canonicalize(seed_word)
     
     # Create a new game session
-    session_id = await create_game_session(None, {
+    session_id = await session_store.create(None, {
         "current_word": seed_word,
         "guesses": [seed_word],
         "score": 0
@@ -114,14 +237,25 @@ async def new_game(seed_word: str = "rock"):
     }
 
 @router.get("/history/{session_id}")
-async def get_history(session_id: str):
-    game_session = await get_game_session(session_id)
+async def get_history(
+    session_id: str,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE)
+):
+    # One page of the chain, oldest first. Pass next_cursor back to get the next page.
+    game_session = await session_store.history(session_id, cursor, limit)
     
     if not game_session:
         raise HTTPException(status_code=404, detail="Game session not found")
     
+    # The chain is the seed word plus one guess per point
+    total = game_session["score"] + 1
+    next_cursor = cursor + len(game_session["guesses"])
+    
     return {
         "current_word": game_session["current_word"],
         "guesses": game_session["guesses"],
-        "score": game_session["score"]
+        "score": game_session["score"],
+        "total": total,
+        "next_cursor": next_cursor if next_cursor < total else None
     }
@@ -0,0 +1,211 @@
+import os
+import json
+import asyncio
+from typing import Dict, Any, List
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from backend.api.game_routes import rejected_message, game_over_message, finished_message, accepted_message
+from backend.core.game_logic import GameSession, validate_beats
+from backend.core.cache import check_rate_limit, get_rate_limit_rule
+from backend.core.canonical import canonicalize
+from backend.core.moderation import check_guess
+from backend.core.metrics import timed
+from backend.core.prefetch import prefetcher
+from backend.db.models import update_global_counter, get_global_counter, session_store
+
+router = APIRouter(prefix="/api", tags=["game"])
+
+WS_CHECKPOINT_EVERY = int(os.getenv("WS_CHECKPOINT_EVERY", "5"))  # Accepted guesses held in memory before writing them
+WS_CHECKPOINT_IDLE = float(os.getenv("WS_CHECKPOINT_IDLE", "5"))  # Seconds without a guess before writing them
+
+_open_connections = 0
+
+async def _within_rate_limit(websocket: WebSocket, path: str) -> bool:
+    """Apply the HTTP rate limit rule for `path` to a WebSocket, which the middleware never sees"""
+    rule = get_rate_limit_rule(path)
+    if rule is None:
+        return True
+    prefix, limit, window = rule
+    client_ip = websocket.client.host if websocket.client else "unknown"
+    return await check_rate_limit(getattr(websocket.app.state, "redis", None), client_ip, limit, window, scope=prefix)
+
+def get_ws_stats() -> Dict[str, int]:
+    """Get the number of open game channels in this worker"""
+    return {"connections": _open_connections}
+
+class ResidentSession:
+    """A game session held in memory for one connection, plus the guesses not written yet"""
+
+    def __init__(self, session_id: str, data: Dict[str, Any]):
+        self.session_id = session_id
+        self.game = GameSession.from_dict({**data, "id": session_id})
+        self.saved_word = self.game.current_word  # End of the chain as last written
+        self.unsaved: List[str] = []
+        self.finished = data.get("status") == "finished"
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "current_word": self.game.current_word,
+            "score": self.game.score,
+            "previous_guesses": self.game.guesses[-5:]
+        }
+
+    async def checkpoint(self) -> bool:
+        """Write the unsaved guesses"""
+        if not self.unsaved:
+            return True
+
+        guesses, self.unsaved = self.unsaved, []
+        with timed("session_checkpoint"):
+            saved = await session_store.checkpoint(self.session_id, guesses, self.saved_word)
+        if saved:
+            self.saved_word = guesses[-1]
+        return saved
+
+    async def finish(self, guess: str) -> bool:
+        """Write the unsaved guesses, then mark the game finished because `guess` repeats one of them"""
+        if not await self.checkpoint():
+            return False
+        with timed("session_finish"):
+            finished = await session_store.finish(self.session_id, guess, self.saved_word)
+        self.finished = finished is not None
+        return self.finished
+
+    async def reload(self) -> bool:
+        data = await session_store.get(self.session_id, tail=None)
+        if not data:
+            return False
+        self.__init__(self.session_id, data)
+        return True
+
+async def _checkpoint(websocket: WebSocket, session: ResidentSession) -> bool:
+    """Write unsaved guesses, returning False if the connection had to be closed"""
+    if await session.checkpoint():
+        return True
+
+    # The game was changed elsewhere (e.g. another tab), so ours is out of date
+    if not await session.reload():
+        await websocket.close(code=4404, reason="Game session not found")
+        return False
+    await websocket.send_json({
+        "type": "state",
+        "message": "⚠️ This game was changed somewhere else, here is its latest state.",
+        **session.state()
+    })
+    return True
+
+async def _play(session: ResidentSession, message: Dict[str, Any], persona: str) -> Dict[str, Any]:
+    """Same rules as POST /api/guess, against the in-memory session"""
+    guess = str(message.get("guess", "")).strip().lower()
+    if not guess:
+        return {"type": "error", "message": "Please enter a guess"}
+
+    with timed("moderation"):
+        blocked = check_guess(guess)
+    if blocked:
+        return {"type": "error", "message": "Inappropriate content detected"}
+    guess = canonicalize(guess)
+
+    game = session.game
+    current_word = game.current_word
+
+    # A finished game takes no more guesses, so don't spend an AI call on one
+    if session.finished:
+        return {"type": "verdict", "valid": False, "message": finished_message(), "global_count": 0, **session.state()}
+
+    with timed("verdict"):
+        result = await validate_beats(guess, current_word, message.get("persona") or persona)
+
+    if not result["valid"]:
+        return {
+            "type": "verdict",
+            "valid": False,
+            "message": rejected_message(guess, current_word, result),
+            "global_count": 0,
+            **session.state()
+        }
+
+    if not game.add_guess(guess):
+        # If the game was changed elsewhere, pick up its latest state instead
+        if not await session.finish(guess):
+            await session.reload()
+        return {
+            "type": "verdict",
+            "valid": False,
+            "message": game_over_message(guess),
+            "global_count": await get_global_counter(guess),
+            **session.state()
+        }
+    session.unsaved.append(guess)
+    prefetcher.after_accept(current_word, guess)
+
+    with timed("global_counter"):
+        global_count = await update_global_counter(guess)
+
+    return {
+        "type": "verdict",
+        "valid": True,
+        "message": accepted_message(guess, current_word, global_count),
+        "global_count": global_count,
+        **session.state()
+    }
+
+@router.websocket("/ws/{session_id}")
+async def game_channel(websocket: WebSocket, session_id: str, persona: str = "serious"):
+    """
+    Play a game over one connection. Send {"guess": "...", "persona": "..."} and receive
+    the same fields as POST /api/guess with "type": "verdict". The session stays in memory
+    while connected and accepted guesses are written every WS_CHECKPOINT_EVERY guesses,
+    after WS_CHECKPOINT_IDLE idle seconds and on disconnect.
+    """
+    global _open_connections
+
+    # Opening a channel counts like any other API request
+    if not await _within_rate_limit(websocket, websocket.url.path):
+        await websocket.close(code=4429, reason="Too many requests")
+        return
+
+    await websocket.accept()
+    data = await session_store.get(session_id, tail=None)
+    if not data:
+        await websocket.close(code=4404, reason="Game session not found")
+        return
+
+    session = ResidentSession(session_id, data)
+    await websocket.send_json({"type": "state", **session.state()})
+
+    _open_connections += 1
+    try:
+        while True:
+            try:
+                text = await asyncio.wait_for(websocket.receive_text(), timeout=WS_CHECKPOINT_IDLE)
+            except asyncio.TimeoutError:
+                if not await _checkpoint(websocket, session):
+                    return
+                continue
+
+            try:
+                message = json.loads(text)
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "message": "Messages must be JSON"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "message": "Messages must be JSON objects"})
+                continue
+
+            # Guesses share the POST /api/guess budget, since each can cost an AI call
+            if not await _within_rate_limit(websocket, "/api/guess"):
+                await websocket.send_json({"type": "error", "message": "Too many requests, please slow down"})
+                continue
+
+            # Reply first, the write can happen while the player thinks
+            await websocket.send_json(await _play(session, message, persona))
+            if len(session.unsaved) >= WS_CHECKPOINT_EVERY and not await _checkpoint(websocket, session):
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _open_connections -= 1
+        if not await session.checkpoint():
+            print(f"Session {session_id} changed elsewhere, dropped its unsaved WebSocket guesses")
@@ -1,16 +1,44 @@
 
 import os
+import time
+import asyncio
 import google.generativeai as genai
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 import json
 
-# Configure Gemini API
+from backend.core.batching import MicroBatcher
+from backend.core.metrics import timed, ai_calls, ai_tokens
+from backend.core.resilience import AdaptiveTimeout, CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
+
+# Gemini API key, checked when the model is first used
 api_key = os.getenv("GEMINI_API_KEY", "")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY environment variable not set")
+AI_MODEL = os.getenv("AI_MODEL", "gemini-pro")  # Gemini model, also recorded with stored verdicts
+model = None
+
+# Concurrency limits for upstream AI calls
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))  # Calls in flight at once (per worker)
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "100"))  # Callers allowed to wait for a slot
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "5"))  # Seconds to wait for a slot
+AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT", "10"))  # Longest a model call may take
+
+# Resilience: adaptive timeouts, circuit breaker and hedged calls
+AI_TIMEOUT_MIN = float(os.getenv("AI_TIMEOUT_MIN", "1"))  # Shortest adaptive timeout
+AI_TIMEOUT_MULTIPLIER = float(os.getenv("AI_TIMEOUT_MULTIPLIER", "2"))  # Timeout = p99 latency * this
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))  # Consecutive failures that open the circuit
+AI_BREAKER_RESET = float(os.getenv("AI_BREAKER_RESET", "30"))  # Seconds before a trial call
+AI_HEDGE = os.getenv("AI_HEDGE", "false").lower() == "true"  # Retry calls slower than the p95
+
+# Micro-batching of verdict requests (a batch size of 1 disables it)
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "1"))
+AI_BATCH_DELAY = float(os.getenv("AI_BATCH_DELAY", "0.01"))  # Seconds to wait for more requests
+
+_ai_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+_ai_in_flight = 0
+_ai_waiting = 0
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel('gemini-pro')
+_latencies = LatencyTracker()
+_timeout = AdaptiveTimeout(_latencies, min(AI_TIMEOUT_MIN, AI_CALL_TIMEOUT), AI_CALL_TIMEOUT, AI_TIMEOUT_MULTIPLIER)
+_breaker = CircuitBreaker(AI_BREAKER_FAILURES, AI_BREAKER_RESET)
 
 SERIOUS_PROMPT = """
 You are a judge for a game called "What Beats What". 
@@ -47,34 +75,289 @@ Be CREATIVE, ENERGETIC, and ready to HAVE FUN! Use EMOJIS and keep it EXCITING!
 Respond ONLY with a JSON object, nothing else.
 """
 
+BATCH_INSTRUCTIONS = """
+You will be given several numbered pairs instead of one. Judge each pair independently.
+Respond ONLY with a JSON array containing one object per pair, in the same order, each with these fields:
+- index: the number of the pair
+- valid: a boolean indicating if X beats Y (true or false)
+- explanation: the explanation for that pair, in the style described above
+"""
+
+REPHRASE_PROMPT = """
+You are an ENTHUSIASTIC and FUN host for a game called "What Beats What"!!! 😄🎮
+Rewrite the judge's explanation below in a FUN, ENTHUSIASTIC style with emojis (max 15 words).
+Keep the same meaning. Respond ONLY with the rewritten explanation, nothing else.
+"""
+
+def get_ai_queue_stats() -> Dict[str, int]:
+    """Get the current state of the AI call queue"""
+    return {
+        "in_flight": _ai_in_flight,
+        "waiting": _ai_waiting,
+        "max_concurrency": AI_MAX_CONCURRENCY,
+        "max_queue": AI_MAX_QUEUE
+    }
+
+def ai_configured() -> bool:
+    """Whether an API key is available for the model"""
+    return bool(api_key)
+
+def _get_model():
+    """Configure Gemini and build the model on first use"""
+    global model
+    if model is None:
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(AI_MODEL)
+    return model
+
+async def _gemini_generate(content: str) -> str:
+    response = await _get_model().generate_content_async(content)
+    return response.text
+
+# Turns a prompt into the model's text response; swapped out by load tests
+_generator: Callable[[str], Awaitable[str]] = _gemini_generate
+
+def set_generator(generator: Optional[Callable[[str], Awaitable[str]]]) -> None:
+    """Replace the upstream model call (e.g. with a local stand-in), or restore Gemini with None"""
+    global _generator
+    _generator = generator or _gemini_generate
+
+def get_ai_resilience_stats() -> Dict[str, Any]:
+    """Get the circuit breaker state and current adaptive timeout"""
+    return {
+        "circuit": _breaker.state,
+        "consecutive_failures": _breaker.failures,
+        "timeout": round(_timeout.current(), 3),
+        "p95_latency": _latencies.percentile(0.95)
+    }
+
+def _hedge_delay() -> Optional[float]:
+    # Only hedge once we know what a slow call looks like
+    if not AI_HEDGE or len(_latencies) < _timeout.min_samples:
+        return None
+    return _latencies.percentile(0.95)
+
+def _can_hedge() -> bool:
+    # Hedges only use spare capacity, never a slot someone is waiting for
+    return _ai_waiting == 0 and not _ai_slots.locked()
+
+async def _hedge_attempt(content: str) -> str:
+    """The second attempt of a hedged call, holding a concurrency slot of its own"""
+    global _ai_in_flight
+    # The slot seen by _can_hedge may have been taken since; then the first attempt carries on alone
+    if _ai_waiting or _ai_slots.locked():
+        raise RuntimeError("No spare AI capacity to hedge")
+    # A free slot is taken without waiting
+    await _ai_slots.acquire()
+    _ai_in_flight += 1
+    ai_calls.inc("hedge")
+    try:
+        return await _generator(content)
+    finally:
+        _ai_in_flight -= 1
+        _ai_slots.release()
+
+async def _generate(content: str) -> str:
+    """Run one model call without blocking the event loop, bounded by the concurrency limit"""
+    global _ai_in_flight, _ai_waiting
+    
+    # Fail fast while the upstream is unhealthy
+    if _breaker.is_open():
+        ai_calls.inc("circuit_open")
+        raise CircuitOpenError("AI circuit is open")
+    
+    # Shed load instead of queueing without bound
+    if _ai_slots.locked() and _ai_waiting >= AI_MAX_QUEUE:
+        ai_calls.inc("queue_full")
+        raise RuntimeError("AI queue is full")
+    
+    _ai_waiting += 1
+    try:
+        with timed("ai_queue"):
+            await asyncio.wait_for(_ai_slots.acquire(), timeout=AI_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        ai_calls.inc("queue_timeout")
+        raise
+    finally:
+        _ai_waiting -= 1
+    
+    # The circuit may have opened, or another caller may hold the trial call, while we queued
+    if not _breaker.allow():
+        _ai_slots.release()
+        ai_calls.inc("circuit_open")
+        raise CircuitOpenError("AI circuit is open")
+    
+    _ai_in_flight += 1
+    ai_tokens.inc("prompt", amount=len(content) // 4)
+    try:
+        start = time.perf_counter()
+        with timed("ai_call"):
+            text = await asyncio.wait_for(
+                hedged(lambda: _generator(content), _hedge_delay(), _can_hedge, lambda: _hedge_attempt(content)),
+                timeout=_timeout.current()
+            )
+        _latencies.record(time.perf_counter() - start)
+        _breaker.record_success()
+        ai_calls.inc("ok")
+        ai_tokens.inc("response", amount=len(text) // 4)
+        return text
+    except asyncio.TimeoutError:
+        _breaker.record_failure()
+        ai_calls.inc("timeout")
+        raise
+    except asyncio.CancelledError:
+        # No verdict on the upstream either way, but a trial call mustn't hold the circuit half-open
+        _breaker.release_trial()
+        raise
+    except Exception:
+        _breaker.record_failure()
+        ai_calls.inc("error")
+        raise
+    finally:
+        _ai_in_flight -= 1
+        _ai_slots.release()
+
+def _persona_prompt(persona: str) -> str:
+    return SERIOUS_PROMPT if persona.lower() == "serious" else CHEERY_PROMPT
+
 async def get_ai_response(guess: str, word: str, persona: str = "serious") -> Dict[str, Any]:
-    """Get response from Gemini AI"""
+    """Get response from Gemini AI, batched with other pending requests when enabled"""
+    if AI_BATCH_SIZE > 1:
+        return await _get_batcher(persona).submit((guess, word))
+    
+    return await _judge_single(guess, word, persona)
+
+async def _judge_single(guess: str, word: str, persona: str) -> Dict[str, Any]:
+    """Ask Gemini about a single pair"""
     try:
-        prompt = SERIOUS_PROMPT if persona.lower() == "serious" else CHEERY_PROMPT
+        prompt = _persona_prompt(persona)
         
         # Construct the prompt for Gemini
         content = f"{prompt}\n\nGuess (X): {guess}\nWord (Y): {word}"
         
-        response = model.generate_content(content)
+        response_text = await _generate(content)
         
         # Parse the response
         try:
-            # Extract JSON from response
-            response_text = response.text
-            result = json.loads(response_text)
+            # Extract JSON from response, which the model sometimes wraps in a code fence
+            result = json.loads(_strip_code_fence(response_text))
             
             # Validate response structure
             if not isinstance(result, dict) or "valid" not in result or "explanation" not in result:
-                return {"valid": False, "explanation": "AI response format error"}
+                return {"valid": False, "explanation": "AI response format error", "error": True}
                 
             return result
         except json.JSONDecodeError:
-            # Fallback parsing if JSON extraction fails
-            response_text = response.text.lower()
+            # Fallback parsing if JSON extraction fails. It's a guess at the verdict,
+            # so "heuristic" keeps it out of the durable verdict store.
+            response_text = response_text.lower()
             valid = "true" in response_text and "valid" in response_text
             explanation = "Based on AI judgment"
-            return {"valid": valid, "explanation": explanation}
+            return {"valid": valid, "explanation": explanation, "heuristic": True}
             
+    # Failed verdicts carry "error" so they are never cached as real ones
+    except asyncio.TimeoutError:
+        print("Error in AI response: timed out")
+        return {"valid": False, "explanation": "AI service timed out", "error": True}
+    except CircuitOpenError:
+        return {"valid": False, "explanation": "AI service is temporarily unavailable", "error": True}
     except Exception as e:
         print(f"Error in AI response: {str(e)}")
-        return {"valid": False, "explanation": "Error connecting to AI service"}
\ No newline at end of file
+        return {"valid": False, "explanation": "Error connecting to AI service", "error": True}
+
+# One batcher per prompt, since pairs can only share a request if they share a prompt
+_batchers: Dict[str, MicroBatcher] = {}
+
+def _get_batcher(persona: str) -> MicroBatcher:
+    prompt_key = "serious" if persona.lower() == "serious" else "cheery"
+    if prompt_key not in _batchers:
+        async def handler(pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+            return await _judge_batch(pairs, prompt_key)
+        _batchers[prompt_key] = MicroBatcher(handler, AI_BATCH_SIZE, AI_BATCH_DELAY)
+    return _batchers[prompt_key]
+
+def get_ai_batch_stats() -> Dict[str, Dict[str, int]]:
+    """Get batch counters per persona"""
+    return {persona: batcher.stats() for persona, batcher in _batchers.items()}
+
+async def drain_ai_calls(timeout: float) -> bool:
+    """On shutdown, send open batches and let queued and in-flight calls finish, for up to `timeout` seconds"""
+    deadline = time.monotonic() + timeout
+    try:
+        await asyncio.wait_for(asyncio.gather(*[batcher.drain() for batcher in _batchers.values()]), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    
+    while (_ai_in_flight or _ai_waiting) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return not (_ai_in_flight or _ai_waiting)
+
+def _strip_code_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1]
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+async def _judge_batch(pairs: List[Tuple[str, str]], persona: str) -> List[Dict[str, Any]]:
+    """
+    Ask Gemini about several pairs in one request, falling back to single calls for elements
+    missing from the reply or malformed. If the request itself fails, every pair gets an error
+    verdict instead, so a degraded model isn't sent one more call per pair.
+    """
+    if len(pairs) == 1:
+        return [await _judge_single(pairs[0][0], pairs[0][1], persona)]
+    
+    questions = "\n".join(
+        f"{index}. Guess (X): {guess} | Word (Y): {word}"
+        for index, (guess, word) in enumerate(pairs, start=1)
+    )
+    content = f"{_persona_prompt(persona)}\n{BATCH_INSTRUCTIONS}\n{questions}"
+    
+    try:
+        response_text = await _generate(content)
+    except asyncio.TimeoutError:
+        print("Error in AI batch response: timed out")
+        return [{"valid": False, "explanation": "AI service timed out", "error": True} for _ in pairs]
+    except CircuitOpenError:
+        return [{"valid": False, "explanation": "AI service is temporarily unavailable", "error": True} for _ in pairs]
+    except Exception as e:
+        print(f"Error in AI batch response: {str(e)}")
+        return [{"valid": False, "explanation": "Error connecting to AI service", "error": True} for _ in pairs]
+    
+    verdicts: Dict[int, Dict[str, Any]] = {}
+    try:
+        items = json.loads(_strip_code_fence(response_text))
+        if isinstance(items, list):
+            for position, item in enumerate(items, start=1):
+                if not isinstance(item, dict) or not isinstance(item.get("valid"), bool) or "explanation" not in item:
+                    continue
+                index = item.get("index", position)
+                if isinstance(index, int) and 1 <= index <= len(pairs):
+                    verdicts[index] = {"valid": item["valid"], "explanation": str(item["explanation"])}
+    except json.JSONDecodeError as e:
+        print(f"Error in AI batch response: {str(e)}")
+    
+    async def resolve(index: int, guess: str, word: str) -> Dict[str, Any]:
+        if index in verdicts:
+            return verdicts[index]
+        return await _judge_single(guess, word, persona)
+    
+    return list(await asyncio.gather(*[
+        resolve(index, guess, word) for index, (guess, word) in enumerate(pairs, start=1)
+    ]))
+
+async def rephrase_explanation(explanation: str, guess: str, word: str, persona: str) -> Optional[str]:
+    """Restyle a verdict explanation for a persona, or None if the AI call fails"""
+    try:
+        content = f"{REPHRASE_PROMPT}\nGuess (X): {guess}\nWord (Y): {word}\nExplanation: {explanation}"
+        text = (await _generate(content)).strip()
+        return text or None
+    except asyncio.TimeoutError:
+        print("Error in AI rephrase: timed out")
+        return None
+    except Exception as e:
+        print(f"Error in AI rephrase: {str(e)}")
+        return None
@@ -0,0 +1,70 @@
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+class MicroBatcher:
+    """Collect submitted items for a few milliseconds and resolve them with a single handler call"""
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]], max_size: int, max_delay: float):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.handler([item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def drain(self) -> None:
+        """Send the pending batch now and wait for every running batch"""
+        self._flush()
+        if self._running:
+            await asyncio.wait(list(self._running))
+
+    def stats(self) -> dict:
+        """Get batch counters"""
+        return {
+            "pending": len(self._pending),
+            "running": len(self._running),
+            "batches": self.batches,
+            "items": self.items
+        }
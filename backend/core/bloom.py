@@ -0,0 +1,56 @@
+
+import math
+import hashlib
+from typing import Any, Dict, List
+
+class BloomFilter:
+    """
+    Fixed-size set of strings with no false negatives: `item in bloom` is False only
+    for items that were never added, and wrongly True for about `error_rate` of the others
+    once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the filter's size and approximate fill"""
+        return {
+            "items": self.count,
+            "capacity": self.capacity,
+            "bytes": len(self._bits),
+            "hashes": self.hashes
+        }
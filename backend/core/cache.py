@@ -1,49 +1,388 @@
 
 import os
 import json
-from typing import Any, Optional, Dict
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, Optional, Dict, List, Tuple
 import redis.asyncio as redis
 
+from backend.core.canonical import canonicalize
+from backend.core.metrics import timed_datastore, verdict_cache_lookups
+
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 CACHE_TTL = 3600  # Cache entries expire after 1 hour
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "0"))  # Per worker, unlimited if 0 (backend.serve derives it)
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))  # Seconds to wait for a free connection
 
 async def init_redis_pool():
-    """Initialize Redis connection pool"""
-    return await redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    """Initialize Redis connection pool. Connections are opened on first use."""
+    if REDIS_MAX_CONNECTIONS:
+        # Wait for a free connection rather than failing when the pool is full
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL, encoding="utf-8", decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+        )
+        return redis.Redis.from_pool(pool)
+    return redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
 
-async def get_cache(redis_client, key: str) -> Optional[Dict[str, Any]]:
-    """Get value from Redis cache"""
+async def close_redis_pool(redis_client) -> None:
+    """Close every connection in the pool"""
     try:
-        value = await redis_client.get(key)
-        if value:
-            return json.loads(value)
-        return None
+        await redis_client.aclose()
+    except Exception as e:
+        print(f"Redis close error: {str(e)}")
+
+async def ping_redis(redis_client, timeout: float) -> bool:
+    """Check that Redis answers within the timeout"""
+    if redis_client is None:
+        return False
+    try:
+        return bool(await asyncio.wait_for(redis_client.ping(), timeout=timeout))
+    except Exception as e:
+        print(f"Redis ping error: {str(e)}")
+        return False
+
+_scripts: Dict[str, Any] = {}
+
+def registered_script(redis_client, source: str):
+    """
+    A Lua script registered once, so calls send its SHA (EVALSHA) rather than its body.
+    Call it with client=redis_client; the body is only resent if the server lost it.
+    """
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = redis_client.register_script(source)
+    return script
+
+# In-process L1 cache in front of Redis
+LOCAL_CACHE_SIZE = int(os.getenv("LOCAL_CACHE_SIZE", "1024"))  # Max entries per worker
+LOCAL_CACHE_TTL = min(float(os.getenv("LOCAL_CACHE_TTL", "300")), CACHE_TTL)  # Never outlives Redis
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "2"))  # Seconds to remember a Redis miss
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Identifies this worker's own invalidation messages so it can ignore them
+WORKER_ID = uuid.uuid4().hex
+
+_MISSING = object()
+
+class LocalCache:
+    """Bounded LRU cache with per-entry expiry. A stored value of None marks a known miss."""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Any:
+        """Get a value, or _MISSING if the key is absent or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return _MISSING
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry if full"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: str) -> None:
+        """Drop a single key"""
+        self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """Drop every key"""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+local_cache = LocalCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TTL)
+
+async def _fetch_remote(redis_client, key: str) -> Optional[Dict[str, Any]]:
+    """Read a key from Redis and remember the result (or the miss) locally"""
+    try:
+        with timed_datastore("redis", "get"):
+            value, pttl = await redis_client.pipeline(transaction=False).get(key).pttl(key).execute()
     except Exception as e:
         print(f"Redis get error: {str(e)}")
         return None
+    
+    if not value:
+        verdict_cache_lookups.inc("redis", "miss")
+        local_cache.set(key, None, NEGATIVE_CACHE_TTL)
+        return None
+    
+    verdict_cache_lookups.inc("redis", "hit")
+    result = json.loads(value)
+    # Expire locally no later than Redis does
+    local_cache.set(key, result, pttl / 1000 if pttl > 0 else None)
+    return result
+
+async def get_cache(redis_client, key: str) -> Optional[Dict[str, Any]]:
+    """Get value from the local cache, falling back to Redis"""
+    value = local_cache.get(key)
+    if value is not _MISSING:
+        verdict_cache_lookups.inc("local", "hit" if value is not None else "negative_hit")
+        return value
+    
+    verdict_cache_lookups.inc("local", "miss")    
+    return await _fetch_remote(redis_client, key)
+
+async def get_cache_many(redis_client, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """Get many values in order, with one Redis round-trip for everything the local cache lacks"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+    remote: List[int] = []
+    for i, key in enumerate(keys):
+        value = local_cache.get(key)
+        if value is _MISSING:
+            verdict_cache_lookups.inc("local", "miss")
+            remote.append(i)
+        else:
+            verdict_cache_lookups.inc("local", "hit" if value is not None else "negative_hit")
+            results[i] = value
+    
+    if not remote or redis_client is None:
+        return results
+    
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for i in remote:
+            pipe.get(keys[i])
+            pipe.pttl(keys[i])
+        with timed_datastore("redis", "get_many"):
+            replies = await pipe.execute()
+    except Exception as e:
+        print(f"Redis get error: {str(e)}")
+        return results
+    
+    for n, i in enumerate(remote):
+        value, pttl = replies[2 * n], replies[2 * n + 1]
+        if not value:
+            verdict_cache_lookups.inc("redis", "miss")
+            local_cache.set(keys[i], None, NEGATIVE_CACHE_TTL)
+            continue
+        verdict_cache_lookups.inc("redis", "hit")
+        results[i] = json.loads(value)
+        local_cache.set(keys[i], results[i], pttl / 1000 if pttl > 0 else None)
+    return results
 
 async def set_cache(redis_client, key: str, value: Dict[str, Any], ttl: int = CACHE_TTL) -> bool:
-    """Set value in Redis cache"""
+    """Set value in Redis and the local cache"""
+    local_cache.set(key, value, ttl)
     try:
-        await redis_client.set(key, json.dumps(value), ex=ttl)
+        with timed_datastore("redis", "set"):
+            await redis_client.set(key, json.dumps(value), ex=ttl)
+        # Other workers may hold a negative entry for this key
+        await _publish_invalidation(redis_client, key)
         return True
     except Exception as e:
         print(f"Redis set error: {str(e)}")
         return False
 
-def make_cache_key(guess: str, word: str, persona: str) -> str:
-    """Create a consistent cache key"""
-    return f"verdict:{guess.lower()}:{word.lower()}:{persona.lower()}"
+async def invalidate_cache(redis_client, key: str) -> None:
+    """Remove a key from Redis and from every worker's local cache"""
+    local_cache.invalidate(key)
+    try:
+        await redis_client.delete(key)
+        await _publish_invalidation(redis_client, key)
+    except Exception as e:
+        print(f"Redis invalidate error: {str(e)}")
+
+async def _publish_invalidation(redis_client, key: str) -> None:
+    await redis_client.publish(INVALIDATION_CHANNEL, json.dumps({"origin": WORKER_ID, "key": key}))
+
+async def listen_for_invalidations(redis_client) -> None:
+    """Evict local cache entries changed by other workers. Runs until cancelled."""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Entries may have changed while we were not subscribed
+            local_cache.clear()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = json.loads(message["data"])
+                if data.get("origin") != WORKER_ID:
+                    local_cache.invalidate(data["key"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Redis invalidation listener error: {str(e)}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get local cache counters"""
+    return local_cache.stats()
+
+async def acquire_lock(redis_client, key: str, ttl: float) -> Optional[str]:
+    """Try to take a short-lived Redis lock, returning its token if acquired"""
+    token = uuid.uuid4().hex
+    try:
+        if await redis_client.set(key, token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+    except Exception as e:
+        print(f"Redis lock error: {str(e)}")
+        return None
+
+# Only delete the lock if we still own it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+async def release_lock(redis_client, key: str, token: str) -> None:
+    """Release a Redis lock taken with acquire_lock"""
+    try:
+        await registered_script(redis_client, _RELEASE_LOCK_SCRIPT)([key], [token], client=redis_client)
+    except Exception as e:
+        print(f"Redis unlock error: {str(e)}")
+
+async def wait_for_cache(redis_client, key: str, timeout: float, interval: float = 0.05,
+                         lock_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Poll the cache until a value appears, the timeout runs out or `lock_key` is released"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        # Checked before the cache, so a value written before the release is still seen
+        locked = True
+        if lock_key is not None:
+            try:
+                locked = bool(await redis_client.exists(lock_key))
+            except Exception as e:
+                print(f"Redis lock check error: {str(e)}")
+        value = await _fetch_remote(redis_client, key)
+        if value or not locked or asyncio.get_running_loop().time() >= deadline:
+            return value
+        await asyncio.sleep(interval)
+
+def make_cache_key(guess: str, word: str) -> str:
+    """Create a consistent cache key. Verdicts are shared by all personas."""
+    return f"verdict:{canonicalize(guess)}:{canonicalize(word)}"
 
 # Rate limiting functions
-async def check_rate_limit(redis_client, ip: str, limit: int = 100, window: int = 60) -> bool:
-    """Check if IP has exceeded rate limit"""
-    key = f"ratelimit:{ip}:{int(time.time()) // window}"
-    count = await redis_client.incr(key)
+
+def _parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Parse "prefix=limit/window,..." into {prefix: (limit, window)}"""
+    rules = {}
+    for rule in spec.split(","):
+        if "=" not in rule:
+            continue
+        prefix, value = rule.strip().split("=", 1)
+        limit, window = value.split("/", 1)
+        rules[prefix] = (int(limit), int(window))
+    return rules
+
+# Requests allowed per window (seconds) by path prefix; the longest matching prefix wins.
+# Paths that match no prefix (static assets, /health) are not limited. /api/verdicts/batch
+# counts verdict pairs rather than requests, since each pair can cost an AI call.
+RATE_LIMITS = _parse_rate_limits(os.getenv(
+    "RATE_LIMITS",
+    "/api/=100/60,/api/guess=60/60,/api/new-game=20/60,/api/verdicts/batch=1000/60"
+))
+LOCAL_RATE_LIMIT_KEYS = int(os.getenv("LOCAL_RATE_LIMIT_KEYS", "10000"))  # Bound on the fallback limiter
+
+def get_rate_limit_rule(path: str) -> Optional[Tuple[str, int, int]]:
+    """Get (prefix, limit, window) for a request path, or None if it isn't limited"""
+    matches = [prefix for prefix in RATE_LIMITS if path.startswith(prefix)]
+    if not matches:
+        return None
+    prefix = max(matches, key=len)
+    limit, window = RATE_LIMITS[prefix]
+    return prefix, limit, window
+
+# Sliding window estimate: the previous window's count, weighted by how much of it
+# still overlaps the sliding window, plus the current window's count
+_SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call("get", KEYS[1]) or "0")
+local previous = tonumber(redis.call("get", KEYS[2]) or "0")
+if previous * tonumber(ARGV[3]) + current + tonumber(ARGV[4]) > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call("incrby", KEYS[1], ARGV[4])
+redis.call("expire", KEYS[1], tonumber(ARGV[2]) * 2)
+return 1
+"""
+
+class LocalRateLimiter:
+    """Per-worker sliding window limiter with a bounded number of tracked keys, used when Redis is down"""
     
-    if count == 1:
-        await redis_client.expire(key, window)
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()  # key -> (window index, current, previous)
     
-    return count <= limit
+    def hit(self, key: str, limit: int, window: int, now: float, cost: int = 1) -> bool:
+        index = int(now // window)
+        window_index, current, previous = self._windows.get(key, (index, 0, 0))
+        if window_index == index - 1:
+            current, previous = 0, current
+        elif window_index != index:
+            current, previous = 0, 0
+        
+        overlap = 1 - (now % window) / window
+        allowed = previous * overlap + current + cost <= limit
+        if allowed:
+            current += cost
+        
+        self._windows[key] = (index, current, previous)
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+        return allowed
 
-import time
+local_rate_limiter = LocalRateLimiter(LOCAL_RATE_LIMIT_KEYS)
+
+async def check_rate_limit(redis_client, ip: str, limit: int = 100, window: int = 60, scope: str = "default",
+                           cost: int = 1) -> bool:
+    """Check if IP is still within its rate limit, counting this request as `cost`. Shared by all workers through Redis."""
+    now = time.time()
+    key = f"ratelimit:{scope}:{ip}"
+    
+    if redis_client is not None:
+        index = int(now // window)
+        overlap = 1 - (now % window) / window
+        try:
+            allowed = await registered_script(redis_client, _SLIDING_WINDOW_SCRIPT)(
+                [f"{key}:{index}", f"{key}:{index - 1}"], [limit, window, overlap, cost], client=redis_client
+            )
+            return bool(allowed)
+        except Exception as e:
+            print(f"Redis rate limit error: {str(e)}")
+    
+    return local_rate_limiter.hit(key, limit, window, now, cost)
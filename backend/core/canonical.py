@@ -0,0 +1,76 @@
+
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+# Distinct raw inputs whose canonical form is remembered
+CANONICAL_CACHE_SIZE = int(os.getenv("CANONICAL_CACHE_SIZE", "65536"))
+
+ARTICLES = {"a", "an", "the"}
+
+# Words that end in "s" without being plurals of something else
+INVARIANT_WORDS = {
+    "scissors", "glasses", "pants", "trousers", "jeans", "shorts", "pliers", "tongs", "binoculars",
+    "news", "series", "species", "physics", "mathematics", "chess", "lens", "gas", "atlas", "canvas",
+    "chaos", "cosmos", "christmas", "mars", "texas", "paris", "bias", "always", "sometimes"
+}
+
+# Names ending in "s", which are played and shown as typed
+PROPER_NOUNS = {
+    "hercules", "achilles", "hades", "hermes", "ares", "thanos", "midas", "xerxes", "moses",
+    "james", "charles", "jones", "thomas", "nicholas", "douglas", "lucas", "carlos", "judas",
+    "athens", "thebes", "brussels", "wales", "andes", "alps", "bahamas", "philippines", "netherlands",
+    "dallas", "vegas", "kansas", "arkansas", "illinois", "mercedes", "adidas", "tetris"
+}
+
+# Singulars ending in "ie", whose plurals would otherwise become "-y"
+IE_WORDS = {
+    "zombie", "movie", "cookie", "pie", "tie", "lie", "brownie", "hippie", "calorie", "rookie",
+    "selfie", "smoothie", "goalie", "genie", "pixie", "hoodie", "newbie", "sweetie", "boogie"
+}
+
+# Singulars ending in "oe", "ve" or "se". Other plurals with those endings are left alone,
+# since their singular may as well end in "o", "f"/"fe" or "s" (volcanoes, knives, buses)
+E_WORDS = {
+    "shoe", "toe", "canoe", "hoe", "oboe", "foe", "floe",
+    "wave", "glove", "cave", "grave", "stove", "olive", "dove", "valve", "curve", "nerve", "sleeve", "slave",
+    "house", "horse", "nurse", "rose", "case", "vase", "cheese", "purse", "course", "verse", "nose", "hose",
+    "cause", "phrase", "base", "fuse", "spouse", "blouse", "corpse", "curse", "eclipse", "universe", "cruise"
+}
+
+_WORD = re.compile(r"\w+")
+_APOSTROPHES = str.maketrans("", "", "'\u2019")
+
+def singularize(word: str) -> str:
+    """Cheap English singular for regular plurals; anything unusual is left alone"""
+    if len(word) <= 3 or word in INVARIANT_WORDS or word in PROPER_NOUNS or not word.isalpha():
+        return word
+    if word.endswith("ies") and len(word) > 4 and word[:-1] not in IE_WORDS:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "ches", "shes", "xes", "zzes")):
+        return word[:-2]
+    if word.endswith(("oes", "ves", "ses")):
+        return word[:-1] if word[:-1] in E_WORDS else word
+    # "ethics" and "physics" aren't plurals of "ethic" and "physic"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is", "ics")):
+        return word[:-1]
+    return word
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def canonicalize(text: str) -> str:
+    """
+    Canonical form of a guess, shared by cache keys, duplicate checks and counters:
+    NFKC, casefolded, apostrophes dropped ("don't" -> "dont"), other punctuation and
+    whitespace collapsed to single spaces, leading articles dropped and the last word
+    singularized. "The Papers!" -> "paper".
+    """
+    normalized = unicodedata.normalize("NFKC", text).casefold().translate(_APOSTROPHES)
+    words = _WORD.findall(normalized.replace("_", " "))
+    if not words:
+        return text.strip().lower()
+
+    while len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
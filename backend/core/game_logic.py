@@ -1,16 +1,34 @@
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+import os
 import uuid
+import asyncio
 from fastapi import Request
 
-from backend.core.ai_client import get_ai_response
-from backend.core.cache import make_cache_key, get_cache, set_cache
+from backend.core.ai_client import get_ai_response, AI_MODEL
+from backend.core.personas import VERDICT_PERSONA, render_verdict
+from backend.core.cache import make_cache_key, get_cache, get_cache_many, set_cache, acquire_lock, release_lock, wait_for_cache
+from backend.core.canonical import canonicalize
+from backend.core.moderation import check_guesses
+from backend.core.prefetch import prefetcher
+from backend.db.verdicts import find_verdict, save_verdict
+
+# Cross-worker coalescing through a Redis lock (in-process coalescing is always on)
+SINGLEFLIGHT_REDIS_LOCK = os.getenv("SINGLEFLIGHT_REDIS_LOCK", "false").lower() == "true"
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv("SINGLEFLIGHT_LOCK_TTL", "15"))  # Seconds
+
+# Uncached pairs of one batch looked up at the same time
+VERDICT_BATCH_CONCURRENCY = int(os.getenv("VERDICT_BATCH_CONCURRENCY", "8"))
+
+# Verdict lookups currently running in this process, keyed by cache key
+_inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
 
 class GameSession:
     def __init__(self, seed_word: str = "rock"):
         self.id = str(uuid.uuid4())
         self.current_word = seed_word.lower()
         self.guesses = [seed_word.lower()]  # The linked list is represented as a list in order
+        self._seen = set(self.guesses)  # Same guesses as a set, for O(1) duplicate checks
         self.score = 0
     
     def to_dict(self) -> Dict[str, Any]:
@@ -28,40 +46,123 @@ class GameSession:
         session = cls(data.get("current_word", "rock"))
         session.id = data.get("id", str(uuid.uuid4()))
         session.guesses = data.get("guesses", [session.current_word])
+        session._seen = set(session.guesses)
         session.score = data.get("score", 0)
         return session
     
     def add_guess(self, guess: str) -> bool:
         """Add a guess to the linked list if it doesn't exist already"""
         guess = guess.lower()
-        if guess in self.guesses:
+        if guess in self._seen:
             return False  # Game over, duplicate guess
         
         self.guesses.append(guess)
+        self._seen.add(guess)
         self.current_word = guess
         self.score += 1
         return True
 
 async def validate_beats(guess: str, current_word: str, persona: str = "serious") -> Dict[str, Any]:
-    """Validate if the guess beats the current word using AI"""
+    """Validate if the guess beats the current word using AI, explained in the persona's style"""
+    prefetcher.note_lookup(guess, current_word)
+    verdict = await get_verdict(guess, current_word)
+    return await render_verdict(verdict, guess, current_word, persona)
+
+async def get_verdict(guess: str, current_word: str) -> Dict[str, Any]:
+    """Get the persona-independent verdict for a pair, shared by every persona"""
     # Import here to avoid circular imports
     from backend.main import app
     
+    redis_client = getattr(app.state, "redis", None)
+    cache_key = make_cache_key(guess, current_word)
+    
     # Check cache if Redis is available
-    if hasattr(app.state, "redis"):
-        redis_client = app.state.redis
-        cache_key = make_cache_key(guess, current_word, persona)
+    if redis_client is not None:
         cached_result = await get_cache(redis_client, cache_key)
         
         if cached_result:
             return cached_result
     
-    # If not in cache, get from AI
-    result = await get_ai_response(guess, current_word, persona)
+    return await _lookup(redis_client, cache_key, guess, current_word)
+
+async def _lookup(redis_client, cache_key: str, guess: str, current_word: str) -> Dict[str, Any]:
+    # Coalesce concurrent misses for the same key onto one lookup. The lookup runs
+    # as its own task so a cancelled caller doesn't fail the others waiting on it.
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_resolve_verdict(redis_client, cache_key, guess, current_word))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+    
+    return await asyncio.shield(task)
+
+async def validate_beats_batch(pairs: List[Tuple[str, str]], persona: str = "serious") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Judge many (guess, word) pairs: moderation over the whole batch, one Redis round-trip
+    for cached verdicts and at most VERDICT_BATCH_CONCURRENCY lookups at once for the rest.
+    Results are yielded in input order, each as soon as it and everything before it is ready.
+    """
+    # Import here to avoid circular imports
+    from backend.main import app
     
-    # Store in cache if Redis is available
-    if hasattr(app.state, "redis"):
-        redis_client = app.state.redis
-        await set_cache(redis_client, cache_key, result)
+    redis_client = getattr(app.state, "redis", None)
+    decisions = check_guesses([text for pair in pairs for text in pair])
+    blocked = [decisions[2 * i] or decisions[2 * i + 1] for i in range(len(pairs))]
+    pairs = [(canonicalize(guess), canonicalize(word)) for guess, word in pairs]
+    keys = [make_cache_key(guess, word) for guess, word in pairs]
     
-    return result
\ No newline at end of file
+    allowed = [i for i in range(len(pairs)) if not blocked[i]]
+    cached = dict(zip(allowed, await get_cache_many(redis_client, [keys[i] for i in allowed])))
+    
+    slots = asyncio.Semaphore(VERDICT_BATCH_CONCURRENCY)
+    
+    async def judge(i: int) -> Dict[str, Any]:
+        async with slots:
+            return await _lookup(redis_client, keys[i], *pairs[i])
+    
+    lookups = {i: asyncio.ensure_future(judge(i)) for i in allowed if cached[i] is None}
+    try:
+        for i, (guess, word) in enumerate(pairs):
+            if blocked[i]:
+                yield {"index": i, "guess": guess, "word": word, "valid": False, "explanation": "Inappropriate content detected", "blocked": True}
+                continue
+            
+            verdict = cached[i] if cached[i] is not None else await lookups[i]
+            yield {"index": i, "guess": guess, "word": word, **await render_verdict(verdict, guess, word, persona)}
+    finally:
+        # The caller stopped early (e.g. the client went away)
+        for task in lookups.values():
+            task.cancel()
+
+async def _resolve_verdict(redis_client, cache_key: str, guess: str, current_word: str) -> Dict[str, Any]:
+    """Get a verdict from the verdict store or AI and cache it, optionally holding a Redis lock so other workers wait for us"""
+    lock_token = None
+    if redis_client is not None and SINGLEFLIGHT_REDIS_LOCK:
+        lock_key = f"lock:{cache_key}"
+        lock_token = await acquire_lock(redis_client, lock_key, SINGLEFLIGHT_LOCK_TTL)
+        
+        if lock_token is None:
+            # Another worker is already asking the AI, wait for its answer. If it releases the
+            # lock without caching one (the call failed), stop waiting and look it up ourselves.
+            cached_result = await wait_for_cache(redis_client, cache_key, SINGLEFLIGHT_LOCK_TTL, lock_key=lock_key)
+            if cached_result:
+                return cached_result
+    
+    try:
+        # Pairs judged before are kept in Mongo after their cache entry expired
+        result = await find_verdict(guess, current_word)
+        
+        # Never judged, ask the AI once and keep the answer (unless it had to be guessed from unparseable text)
+        if result is None:
+            result = await get_ai_response(guess, current_word, VERDICT_PERSONA)
+            if not result.get("error") and not result.get("heuristic"):
+                await save_verdict(guess, current_word, result, AI_MODEL, redis_client)
+        
+        # Store in cache if Redis is available, unless the AI call failed
+        if redis_client is not None and not result.get("error"):
+            await set_cache(redis_client, cache_key, result)
+        
+        return result
+    finally:
+        if lock_token is not None:
+            await release_lock(redis_client, lock_key, lock_token)
@@ -0,0 +1,99 @@
+
+import os
+import time
+import heapq
+import asyncio
+from typing import Any, Dict, List
+
+from backend.core.metrics import timed_datastore
+
+LEADERBOARD_KEY = "leaderboard"
+LEADERBOARD_BUCKET_SECONDS = int(os.getenv("LEADERBOARD_BUCKET_SECONDS", "3600"))  # Width of a trending window
+LEADERBOARD_BUCKETS_KEPT = int(os.getenv("LEADERBOARD_BUCKETS_KEPT", "24"))  # Trending windows kept before expiring
+LEADERBOARD_BACKFILL_BATCH = 1000  # Words per ZADD when rebuilding from global_counters
+
+class Leaderboard:
+    """
+    Most guessed words, all time and per time bucket, kept in Redis sorted sets:
+    one ZINCRBY per counted guess (O(log n)) and one ZREVRANGE per read (O(log n + k)).
+    Without Redis each worker keeps its own counts and reads them with a heap.
+    """
+
+    def __init__(self, bucket_seconds: int, buckets_kept: int):
+        self.bucket_seconds = bucket_seconds
+        self.buckets_kept = buckets_kept
+        self.redis = None
+        self._local: Dict[str, Dict[str, int]] = {}  # "all" or bucket -> word -> count
+
+    def attach(self, redis_client) -> None:
+        """Keep the leaderboard in Redis, shared by every worker"""
+        self.redis = redis_client
+
+    def bucket(self, offset: int = 0) -> int:
+        """Number of the current time bucket, or of an earlier one"""
+        return int(time.time() // self.bucket_seconds) - offset
+
+    def _key(self, window: str) -> str:
+        return f"{LEADERBOARD_KEY}:{window}"
+
+    async def record(self, word: str) -> None:
+        """Count one guess of a word"""
+        bucket = str(self.bucket())
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zincrby(self._key("all"), 1, word)
+                pipe.zincrby(self._key(bucket), 1, word)
+                pipe.expire(self._key(bucket), self.bucket_seconds * self.buckets_kept)
+                with timed_datastore("redis", "leaderboard_record"):
+                    await pipe.execute()
+                return
+            except Exception as e:
+                print(f"Redis leaderboard error: {str(e)}")
+
+        for window in ("all", bucket):
+            counts = self._local.setdefault(window, {})
+            counts[word] = counts.get(word, 0) + 1
+
+        # Forget buckets that have aged out
+        oldest = self.bucket(self.buckets_kept - 1)
+        for window in [window for window in self._local if window != "all" and int(window) < oldest]:
+            del self._local[window]
+
+    async def top(self, window: str = "all", limit: int = 10) -> List[Dict[str, Any]]:
+        """The `limit` most guessed words in a window ("all" or a bucket number), most guessed first"""
+        if self.redis is not None:
+            try:
+                with timed_datastore("redis", "leaderboard_top"):
+                    entries = await self.redis.zrevrange(self._key(window), 0, limit - 1, withscores=True)
+                return [{"word": word, "count": int(score)} for word, score in entries]
+            except Exception as e:
+                print(f"Redis leaderboard error: {str(e)}")
+
+        counts = self._local.get(window, {})
+        return [{"word": word, "count": count} for word, count in heapq.nlargest(limit, counts.items(), key=lambda item: item[1])]
+
+    async def backfill(self, database) -> None:
+        """Build the all-time board from global_counters if Redis doesn't have one yet"""
+        if self.redis is None:
+            return
+
+        try:
+            if await self.redis.exists(self._key("all")):
+                return
+
+            # gt keeps counts other workers raised meanwhile
+            batch: Dict[str, int] = {}
+            async for doc in database.global_counters.find({}, {"_id": 0, "word": 1, "count": 1}):
+                batch[doc["word"]] = doc.get("count", 0)
+                if len(batch) >= LEADERBOARD_BACKFILL_BATCH:
+                    await self.redis.zadd(self._key("all"), batch, gt=True)
+                    batch = {}
+            if batch:
+                await self.redis.zadd(self._key("all"), batch, gt=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Leaderboard backfill error: {str(e)}")
+
+leaderboard = Leaderboard(LEADERBOARD_BUCKET_SECONDS, LEADERBOARD_BUCKETS_KEPT)
@@ -0,0 +1,204 @@
+
+import os
+import time
+import random
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Fraction of requests whose stage timings are recorded (counters are always recorded)
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+# Add a Server-Timing header with per-stage timings to sampled responses
+METRICS_TIMING_HEADERS = os.getenv("METRICS_TIMING_HEADERS", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[LabelValues, float]], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for values, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts + [sum, count]
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *label_values: str) -> float:
+        series = self._series.get(label_values)
+        return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, bucket in zip(self.buckets, series):
+                cumulative += bucket
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+class Registry:
+    """Holds every metric and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+http_request_seconds = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("route", "method", "status")))
+stage_seconds = REGISTRY.register(Histogram(
+    "request_stage_duration_seconds", "Latency of each stage of a request", ("stage",)))
+verdict_cache_lookups = REGISTRY.register(Counter(
+    "verdict_cache_lookups_total", "Verdict cache lookups by tier and result", ("tier", "result")))
+ai_calls = REGISTRY.register(Counter(
+    "ai_calls_total", "Upstream AI calls by outcome", ("outcome",)))
+ai_tokens = REGISTRY.register(Counter(
+    "ai_tokens_estimated_total", "Estimated AI tokens (4 characters per token)", ("direction",)))
+datastore_seconds = REGISTRY.register(Histogram(
+    "datastore_operation_duration_seconds", "MongoDB and Redis operation latency", ("backend", "operation")))
+datastore_errors = REGISTRY.register(Counter(
+    "datastore_errors_total", "Failed MongoDB and Redis operations", ("backend", "operation")))
+
+# Whether the current request is sampled, and the stage timings collected for it
+_sampled: ContextVar[Optional[bool]] = ContextVar("metrics_sampled", default=None)
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("metrics_stages", default=None)
+
+def start_request() -> bool:
+    """Decide whether the current request is sampled; call at the start of each request"""
+    sampled = METRICS_SAMPLE_RATE >= 1 or random.random() < METRICS_SAMPLE_RATE
+    _sampled.set(sampled)
+    _request_stages.set({} if sampled else None)
+    return sampled
+
+def request_stages() -> Optional[Dict[str, float]]:
+    """Stage timings (seconds) recorded so far for the current request, if sampled"""
+    return _request_stages.get()
+
+def _is_sampled() -> bool:
+    sampled = _sampled.get()
+    if sampled is None:
+        # Outside a request, e.g. background tasks
+        return METRICS_SAMPLE_RATE >= 1 or random.random() < METRICS_SAMPLE_RATE
+    return sampled
+
+class timed:
+    """
+    Time a block into a histogram when the request is sampled:
+
+        with timed("verdict"):
+            ...
+    """
+
+    def __init__(self, stage: str, histogram: Optional[Histogram] = None, labels: LabelValues = ()):
+        self.stage = stage
+        # Stages go into the shared stage histogram unless another one is given
+        self.histogram = histogram or stage_seconds
+        self.labels = labels if histogram else (stage,)
+        self.start: Optional[float] = None
+
+    def __enter__(self) -> "timed":
+        if _is_sampled():
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.start is None:
+            return
+        elapsed = time.perf_counter() - self.start
+        self.histogram.observe(elapsed, *self.labels)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[self.stage] = stages.get(self.stage, 0.0) + elapsed
+
+class timed_datastore(timed):
+    """Time a MongoDB or Redis operation and count it if it fails"""
+
+    def __init__(self, backend: str, operation: str):
+        super().__init__(f"{backend}_{operation}", datastore_seconds, (backend, operation))
+        self.backend = backend
+        self.operation = operation
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            datastore_errors.inc(self.backend, self.operation)
+        super().__exit__(exc_type, exc, tb)
+
+def server_timing_header(total: float) -> str:
+    """Format the current request's stage timings as a Server-Timing header"""
+    stages = _request_stages.get() or {}
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return REGISTRY.render()
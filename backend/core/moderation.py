@@ -1,7 +1,11 @@
 
+import os
 from better_profanity import profanity
 import re
-from typing import List, Set
+from functools import lru_cache
+from typing import Iterable, List, Set
+
+from backend.core.canonical import canonicalize
 
 # Initialize profanity filter with extra censored words if needed
 profanity.load_censor_words()
@@ -19,6 +23,28 @@ DANGEROUS_PATTERNS = [
     r"(^|\s)injure(\s|$|ing|ed)",
 ]
 
+MODERATION_CACHE_SIZE = int(os.getenv("MODERATION_CACHE_SIZE", "4096"))  # Memoized decisions
+
+def compile_rules(words: Iterable[str], patterns: Iterable[str]) -> "re.Pattern[str]":
+    """
+    Build the word list and patterns into one regex, so every input is scanned once.
+    A disallowed word must be a whole whitespace-separated token, as with str.split().
+    """
+    alternatives = [f"(?:{pattern})" for pattern in patterns]
+    words = sorted(words)
+    if words:
+        alternatives.append(r"(?:^|\s)(?:" + "|".join(re.escape(word) for word in words) + r")(?=\s|$)")
+    return re.compile("|".join(alternatives))
+
+_rules = compile_rules(DISALLOWED_WORDS, DANGEROUS_PATTERNS)
+
+@lru_cache(maxsize=MODERATION_CACHE_SIZE)
+def _is_blocked(text: str) -> bool:
+    # Cheap single-pass check first, then the profanity filter
+    if _rules.search(text.lower()):
+        return True
+    return profanity.contains_profanity(text)
+
 def check_content(text: str) -> bool:
     """
     Check if content contains profanity or disallowed content
@@ -27,21 +53,22 @@ def check_content(text: str) -> bool:
     if not text or not isinstance(text, str):
         return False
     
-    # Convert to lowercase for case-insensitive matching
-    text_lower = text.lower()
-    
-    # Check for profanity
-    if profanity.contains_profanity(text):
-        return True
-    
-    # Check for disallowed words
-    for word in DISALLOWED_WORDS:
-        if word in text_lower.split():
-            return True
-    
-    # Check for dangerous patterns
-    for pattern in DANGEROUS_PATTERNS:
-        if re.search(pattern, text_lower):
-            return True
+    return _is_blocked(text)
+
+def check_contents(texts: Iterable[str]) -> List[bool]:
+    """Check many strings at once, returning a decision for each in order"""
+    return [check_content(text) for text in texts]
+
+def check_guess(text: str) -> bool:
+    """
+    Check a guess or seed word both as typed and in the canonical form it is played as,
+    since canonicalizing can turn allowed text into a blocked word ("kills" -> "kill")
+    """
+    if not text or not isinstance(text, str):
+        return False
     
-    return False
\ No newline at end of file
+    return _is_blocked(text) or _is_blocked(canonicalize(text))
+
+def check_guesses(texts: Iterable[str]) -> List[bool]:
+    """check_guess for many strings at once, returning a decision for each in order"""
+    return [check_guess(text) for text in texts]
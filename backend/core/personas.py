@@ -0,0 +1,60 @@
+
+import os
+import zlib
+from typing import Dict, Any, Optional
+
+from backend.core.ai_client import rephrase_explanation
+from backend.core.cache import LocalCache, CACHE_TTL, _MISSING
+
+# Verdicts are always judged with this persona's prompt and restyled for the others
+VERDICT_PERSONA = "serious"
+
+# Ask the AI to restyle explanations instead of using templates
+PERSONA_AI_RENDER = os.getenv("PERSONA_AI_RENDER", "false").lower() == "true"
+
+CHEERY_VALID_TEMPLATES = [
+    "BOOM! {explanation}! 💥",
+    "YES! {explanation}! 🎉",
+    "Woohoo! {explanation}! ✨",
+    "Nailed it! {explanation}! 🙌",
+]
+
+CHEERY_INVALID_TEMPLATES = [
+    "Oops! {explanation}! 😅",
+    "Nope! {explanation}! 🙈",
+    "Not this time! {explanation}! 🤔",
+]
+
+# Rephrased explanations, kept per worker since they are purely cosmetic
+_rephrased = LocalCache(int(os.getenv("PERSONA_CACHE_SIZE", "1024")), CACHE_TTL)
+
+def render_template(verdict: Dict[str, Any], guess: str, word: str) -> str:
+    """Restyle an explanation for the cheery persona without an AI call"""
+    templates = CHEERY_VALID_TEMPLATES if verdict.get("valid") else CHEERY_INVALID_TEMPLATES
+    # Pick the same template for the same pair every time
+    template = templates[zlib.crc32(f"{guess}:{word}".encode()) % len(templates)]
+    explanation = str(verdict.get("explanation", "")).rstrip(".! ")
+    return template.format(explanation=explanation)
+
+async def _render_with_ai(verdict: Dict[str, Any], guess: str, word: str, persona: str) -> Optional[str]:
+    key = f"{persona}:{guess}:{word}:{verdict.get('valid')}"
+    explanation = _rephrased.get(key)
+    if explanation is _MISSING:
+        explanation = await rephrase_explanation(verdict.get("explanation", ""), guess, word, persona)
+        if explanation:
+            _rephrased.set(key, explanation)
+    return explanation
+
+async def render_verdict(verdict: Dict[str, Any], guess: str, word: str, persona: str = VERDICT_PERSONA) -> Dict[str, Any]:
+    """Produce the persona's version of a shared verdict"""
+    if persona.lower() == VERDICT_PERSONA:
+        return verdict
+    
+    explanation = None
+    if PERSONA_AI_RENDER:
+        explanation = await _render_with_ai(verdict, guess, word, persona.lower())
+    
+    if not explanation:
+        explanation = render_template(verdict, guess, word)
+    
+    return {**verdict, "explanation": explanation}
@@ -0,0 +1,182 @@
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from backend.core.ai_client import get_ai_queue_stats
+from backend.core.cache import LocalCache, CACHE_TTL, _MISSING, make_cache_key, get_cache
+from backend.core.canonical import canonicalize
+from backend.core.leaderboard import leaderboard
+from backend.core.metrics import REGISTRY, Counter, timed_datastore
+
+PREFETCH = os.getenv("PREFETCH", "false").lower() == "true"  # Warm verdicts for likely next guesses
+PREFETCH_CANDIDATES = int(os.getenv("PREFETCH_CANDIDATES", "3"))  # Guesses predicted per accepted word
+PREFETCH_BUDGET = int(os.getenv("PREFETCH_BUDGET", "60"))  # Prefetches per minute per worker
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))  # Prefetches running at once per worker
+PREFETCH_QUEUE = int(os.getenv("PREFETCH_QUEUE", "100"))  # Accepted guesses waiting to be predicted from
+PREFETCH_SUCCESSOR_TTL = int(os.getenv("PREFETCH_SUCCESSOR_TTL", "604800"))  # Seconds successor counts are kept
+PREFETCH_LOCAL_WORDS = 10000  # Words with successor counts kept per worker without Redis
+
+prefetch_events = REGISTRY.register(Counter(
+    "verdict_prefetch_total", "Speculative verdict prefetches by outcome", ("outcome",)))
+
+class Prefetcher:
+    """
+    After a guess is accepted, predicts the next guesses for the new word (what players
+    guessed after it before, then the most guessed words overall) and warms their verdicts.
+    It runs behind live traffic: only while no AI call is waiting for a slot and at least
+    one slot is free, within a per-minute budget. Predictions that can't run right away
+    are dropped rather than queued, since they go stale.
+    """
+
+    def __init__(self, candidates: int, budget: int, workers: int, queue_size: int):
+        self.candidates = candidates
+        self.budget = budget
+        self.workers = workers
+        self.redis = None
+        self._queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue(queue_size)
+        self._tasks: List[asyncio.Task] = []
+        self._tokens = float(budget)
+        self._refilled_at = time.monotonic()
+        self._successors: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        # Keys warmed but not yet asked for by a player
+        self._warmed = LocalCache(max(budget * 60, 1000), CACHE_TTL)
+
+    def attach(self, redis_client) -> None:
+        self.redis = redis_client
+
+    def after_accept(self, previous_word: str, guess: str) -> None:
+        """Record the transition and predict from the new word, off the request path"""
+        if not self._tasks:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            prefetch_events.inc("dropped")
+        self._queue.put_nowait((previous_word, guess))
+
+    def note_lookup(self, guess: str, word: str) -> None:
+        """Count a player's verdict lookup as a hit if we warmed it"""
+        key = make_cache_key(guess, word)
+        if self._warmed.get(key) is not _MISSING:
+            self._warmed.invalidate(key)
+            prefetch_events.inc("hit")
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.budget, self._tokens + (now - self._refilled_at) * self.budget / 60)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @staticmethod
+    def _ai_idle() -> bool:
+        stats = get_ai_queue_stats()
+        return stats["waiting"] == 0 and stats["in_flight"] < stats["max_concurrency"] - 1
+
+    async def _record_transition(self, previous_word: str, guess: str) -> None:
+        if self.redis is not None:
+            key = f"successors:{previous_word}"
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zincrby(key, 1, guess)
+                pipe.expire(key, PREFETCH_SUCCESSOR_TTL)
+                with timed_datastore("redis", "prefetch_record"):
+                    await pipe.execute()
+                return
+            except Exception as e:
+                print(f"Redis prefetch error: {str(e)}")
+
+        successors = self._successors.setdefault(previous_word, {})
+        successors[guess] = successors.get(guess, 0) + 1
+        self._successors.move_to_end(previous_word)
+        while len(self._successors) > PREFETCH_LOCAL_WORDS:
+            self._successors.popitem(last=False)
+
+    async def _predict(self, word: str) -> List[str]:
+        """Most likely next guesses: seen successors of the word first, then popular words"""
+        successors: List[str] = []
+        if self.redis is not None:
+            try:
+                successors = await self.redis.zrevrange(f"successors:{word}", 0, self.candidates)
+            except Exception as e:
+                print(f"Redis prefetch error: {str(e)}")
+        else:
+            counts = self._successors.get(word, {})
+            successors = sorted(counts, key=counts.get, reverse=True)[:self.candidates + 1]
+
+        popular = [entry["word"] for entry in await leaderboard.top("all", self.candidates + 1)]
+        predicted = []
+        for guess in successors + popular:
+            if guess != word and guess not in predicted:
+                predicted.append(guess)
+        return predicted[:self.candidates]
+
+    async def _warm(self, guess: str, word: str) -> None:
+        # Import here to avoid circular imports
+        from backend.core.game_logic import get_verdict
+        from backend.main import app
+
+        key = make_cache_key(guess, word)
+        redis_client = getattr(app.state, "redis", None)
+        if redis_client is not None and await get_cache(redis_client, key):
+            prefetch_events.inc("already_cached")
+            return
+
+        # Live traffic first: skip rather than wait
+        if not self._ai_idle():
+            prefetch_events.inc("skipped_busy")
+            return
+        if not self._take_token():
+            prefetch_events.inc("skipped_budget")
+            return
+
+        verdict = await get_verdict(guess, word)
+        if verdict.get("error"):
+            prefetch_events.inc("failed")
+            return
+        prefetch_events.inc("warmed")
+        self._warmed.set(key, True)
+
+    async def _run(self) -> None:
+        while True:
+            previous_word, guess = await self._queue.get()
+            try:
+                await self._record_transition(previous_word, guess)
+                for candidate in await self._predict(guess):
+                    await self._warm(canonicalize(candidate), guess)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Prefetch error: {str(e)}")
+
+    def start(self) -> None:
+        """Start the background prefetch workers"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop prefetching; pending predictions are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Get prefetch counters and the hit rate (share of warmed verdicts a player then asked for)"""
+        warmed = prefetch_events.value("warmed")
+        hits = prefetch_events.value("hit")
+        return {
+            "enabled": bool(self._tasks),
+            "queued": self._queue.qsize(),
+            "warmed": int(warmed),
+            "hits": int(hits),
+            "hit_rate": round(hits / warmed, 4) if warmed else 0.0,
+            "skipped_busy": int(prefetch_events.value("skipped_busy")),
+            "skipped_budget": int(prefetch_events.value("skipped_budget"))
+        }
+
+prefetcher = Prefetcher(PREFETCH_CANDIDATES, PREFETCH_BUDGET, PREFETCH_WORKERS, PREFETCH_QUEUE)
@@ -0,0 +1,125 @@
+
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is known to be unhealthy"""
+
+class LatencyTracker:
+    """Recent successful call latencies, for percentile-based timeouts and hedging"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class AdaptiveTimeout:
+    """Timeout that follows observed latency: a multiple of the p99, kept within [minimum, maximum]"""
+
+    def __init__(self, latencies: LatencyTracker, minimum: float, maximum: float,
+                 multiplier: float = 2.0, min_samples: int = 20):
+        self.latencies = latencies
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+
+    def current(self) -> float:
+        # Not enough data yet, be generous
+        if len(self.latencies) < self.min_samples:
+            return self.maximum
+        return min(self.maximum, max(self.minimum, self.latencies.percentile(0.99) * self.multiplier))
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive failures. After `reset_timeout`
+    seconds a single trial call is let through: success closes the circuit again,
+    failure keeps it open for another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected without trying"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.state == self.HALF_OPEN and self._trial_running
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_running = False
+
+    def release_trial(self) -> None:
+        """End a call that gave no verdict (e.g. cancelled), so the next call can be the trial"""
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: Optional[float],
+                 can_hedge: Callable[[], bool] = lambda: True,
+                 hedge_call: Optional[Callable[[], Awaitable[T]]] = None) -> T:
+    """
+    Run `call`, and if it hasn't finished after `delay` seconds (and `can_hedge()` allows it)
+    start a second attempt with `hedge_call` (`call` again if not given). The first attempt
+    to succeed wins and the other is cancelled.
+    """
+    first = asyncio.ensure_future(call())
+    attempts = {first}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and can_hedge():
+                attempts.add(asyncio.ensure_future((hedge_call or call)()))
+
+        while attempts:
+            done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+        # Every attempt failed, report the first one's error
+        return first.result()
+    finally:
+        # Also reached when the caller is cancelled or times out, which mustn't leave calls running
+        for attempt in attempts:
+            attempt.cancel()
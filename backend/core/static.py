@@ -0,0 +1,159 @@
+
+"""
+Frontend assets served straight from memory, ahead of the API middleware.
+
+At startup every file in the frontend directory is read once, compressed with gzip (and
+brotli when the `brotli` package is installed) and given a strong ETag. Scripts and
+stylesheets also get a content-hashed name (app.3f9c1a2b.js) that index.html is rewritten
+to reference, so those can be cached for a year while index.html is revalidated on every
+load and answered with 304 when unchanged. Requests for other paths go on to the app.
+"""
+
+import os
+import gzip
+import hashlib
+import mimetypes
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.getenv("STATIC_DIR", "frontend")  # Directory the frontend is served from
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "31536000"))  # Seconds content-hashed assets are cached
+STATIC_HASHED_SUFFIXES = (".js", ".css")  # Assets given content-hashed names
+STATIC_MIN_COMPRESS = 256  # Smaller files are only served as is
+
+class Asset:
+    """One file with its compressed variants, each with its own strong ETag"""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{self.digest}"')}
+
+        if len(body) >= STATIC_MIN_COMPRESS:
+            # mtime=0 keeps the output, and so the ETag, the same in every worker
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            for encoding, data in compressed.items():
+                if len(data) < len(body):
+                    self.variants[encoding] = (data, f'"{self.digest}-{encoding}"')
+
+    def select(self, accept_encoding: str) -> str:
+        """Smallest variant the client accepts"""
+        accepted = _accepted_encodings(accept_encoding)
+        usable = [encoding for encoding in self.variants if encoding == "identity" or encoding in accepted or "*" in accepted]
+        return min(usable, key=lambda encoding: len(self.variants[encoding][0]))
+
+def _accepted_encodings(header: str) -> List[str]:
+    encodings = []
+    for part in header.split(","):
+        name, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            encodings.append(name.strip().lower())
+    return encodings
+
+def hashed_name(name: str, digest: str) -> str:
+    """app.js -> app.<first 8 hex digits of the content hash>.js"""
+    stem, suffix = os.path.splitext(name)
+    return f"{stem}.{digest[:8]}{suffix}"
+
+def build_assets(directory: str) -> Dict[str, Asset]:
+    """Map request paths to assets for every file at the top of `directory`"""
+    if not os.path.isdir(directory):
+        print(f"Static directory not found: {directory}")
+        return {}
+
+    files: Dict[str, bytes] = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                files[name] = f.read()
+
+    assets: Dict[str, Asset] = {}
+    renamed: Dict[str, str] = {}
+    for name, body in files.items():
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+
+        if name.endswith(STATIC_HASHED_SUFFIXES):
+            asset = Asset(body, content_type, f"public, max-age={STATIC_MAX_AGE}, immutable")
+            renamed[name] = hashed_name(name, asset.digest)
+            assets[f"/{renamed[name]}"] = asset
+            # The plain name still works for anything that links to it directly
+            assets[f"/{name}"] = Asset(body, content_type, "no-cache")
+        elif name != "index.html":
+            assets[f"/{name}"] = Asset(body, content_type, "no-cache")
+
+    if "index.html" in files:
+        html = files["index.html"].decode("utf-8")
+        for name, new_name in renamed.items():
+            html = re.sub(rf'((?:src|href)=")(?:\./)?{re.escape(name)}"', rf'\g<1>{new_name}"', html)
+        index = Asset(html.encode("utf-8"), "text/html; charset=utf-8", "no-cache")
+        assets["/"] = assets["/index.html"] = index
+    return assets
+
+def _if_none_match(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+class StaticAssetsMiddleware:
+    """
+    Answer GET and HEAD requests for frontend assets before the rest of the middleware
+    stack runs, so asset traffic skips rate limiting, request metrics and routing.
+    """
+
+    def __init__(self, app, directory: str = STATIC_DIR, assets: Optional[Dict[str, Asset]] = None):
+        self.app = app
+        self.assets = build_assets(directory) if assets is None else assets
+
+    async def __call__(self, scope, receive, send):
+        asset = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            asset = self.assets.get(scope["path"])
+        if asset is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {}
+        for name, value in scope["headers"]:
+            headers[name.decode("latin-1")] = value.decode("latin-1")
+
+        encoding = asset.select(headers.get("accept-encoding", ""))
+        body, etag = asset.variants[encoding]
+        response_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"vary", b"Accept-Encoding")
+        ]
+
+        if _if_none_match(headers.get("if-none-match", ""), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        response_headers += [
+            (b"content-type", asset.content_type.encode()),
+            (b"content-length", str(len(body)).encode())
+        ]
+        if encoding != "identity":
+            response_headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
@@ -0,0 +1,132 @@
+
+"""
+Moves finished games out of the hot `game_sessions` collection, so it only holds games
+being played and stays small enough to live in Mongo's cache.
+
+Every SESSION_ARCHIVE_INTERVAL seconds one worker (chosen by a Redis lock) takes games
+finished more than SESSION_ARCHIVE_AFTER seconds ago, writes them as compact records
+({"_id": session_id, "guesses", "score", "finished_at"}; the current word is the last
+guess) and deletes them from game_sessions. Records go to the `session_archive`
+collection, or with SESSION_ARCHIVE=file to one gzipped JSONL file per day in
+SESSION_ARCHIVE_DIR. Games that are never finished expire through the TTL index on
+last_active_at instead (see backend.db.migrations.indexes). A one-off run:
+
+    python -m backend.db.archive
+"""
+
+import os
+import gzip
+import json
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReplaceOne
+
+from backend.core.cache import acquire_lock
+from backend.core.metrics import timed_datastore
+from backend.db import models
+
+SESSION_ARCHIVE = os.getenv("SESSION_ARCHIVE", "collection")  # "collection", "file" or "off"
+SESSION_ARCHIVE_AFTER = int(os.getenv("SESSION_ARCHIVE_AFTER", "3600"))  # Seconds finished games stay in game_sessions
+SESSION_ARCHIVE_INTERVAL = float(os.getenv("SESSION_ARCHIVE_INTERVAL", "300"))  # Seconds between archive runs
+SESSION_ARCHIVE_BATCH = int(os.getenv("SESSION_ARCHIVE_BATCH", "500"))  # Games moved per round-trip
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", "archive")  # Where SESSION_ARCHIVE=file writes
+SESSION_ARCHIVE_LOCK = "session_archive:lock"
+
+def compact(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields worth keeping once a game is over"""
+    return {
+        "_id": doc["session_id"],
+        "guesses": doc.get("guesses", []),
+        "score": doc.get("score", 0),
+        "finished_at": doc["finished_at"]
+    }
+
+def _write_file(records: List[Dict[str, Any]], directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    # Appending adds a gzip member per batch, which gzip readers treat as one stream
+    day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    with gzip.open(os.path.join(directory, f"sessions-{day}.jsonl.gz"), "at", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps({**record, "finished_at": record["finished_at"].isoformat()}) + "\n")
+
+async def archive_batch(database, mode: str, cutoff: datetime, batch_size: int) -> int:
+    """Archive up to `batch_size` games finished before `cutoff`, returning how many were moved"""
+    with timed_datastore("mongo", "find_finished_sessions"):
+        docs = await database.game_sessions.find(
+            {"status": "finished", "finished_at": {"$lt": cutoff}},
+            {"_id": 0, "session_id": 1, "guesses": 1, "score": 1, "finished_at": 1}
+        ).sort("finished_at", 1).limit(batch_size).to_list(length=batch_size)
+    if not docs:
+        return 0
+
+    records = [compact(doc) for doc in docs]
+    if mode == "file":
+        await asyncio.to_thread(_write_file, records, SESSION_ARCHIVE_DIR)
+    else:
+        # Upserts, so a batch retried after a failed delete isn't archived twice
+        with timed_datastore("mongo", "archive_sessions"):
+            await database.session_archive.bulk_write(
+                [ReplaceOne({"_id": record["_id"]}, record, upsert=True) for record in records],
+                ordered=False
+            )
+
+    with timed_datastore("mongo", "delete_archived_sessions"):
+        await database.game_sessions.delete_many(
+            {"session_id": {"$in": [record["_id"] for record in records]}, "status": "finished"}
+        )
+    return len(records)
+
+async def archive_finished_sessions(database, mode: str = SESSION_ARCHIVE, older_than: int = SESSION_ARCHIVE_AFTER,
+                                    batch_size: int = SESSION_ARCHIVE_BATCH) -> int:
+    """Archive every game finished more than `older_than` seconds ago"""
+    if mode == "off":
+        return 0
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+    total = 0
+    while True:
+        moved = await archive_batch(database, mode, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+async def get_archived_history(database, session_id: str, start: int, limit: int) -> Optional[Dict[str, Any]]:
+    """A page of an archived game's chain, in the shape of models.get_session_history"""
+    # Archived games are read rarely, so the whole chain is fetched and sliced here
+    with timed_datastore("mongo", "find_archived_history"):
+        doc = await database.session_archive.find_one({"_id": session_id})
+    if doc is None:
+        return None
+    guesses = doc.get("guesses", [])
+    return {"current_word": guesses[-1] if guesses else "", "score": doc.get("score", 0), "guesses": guesses[start:start + limit]}
+
+async def run_archiver(redis_client) -> None:
+    """Archive periodically; with Redis only the worker that takes the lock runs each interval"""
+    if SESSION_ARCHIVE == "off":
+        return
+
+    while True:
+        await asyncio.sleep(SESSION_ARCHIVE_INTERVAL)
+        # The lock isn't released, it expires with the interval
+        if redis_client is not None and await acquire_lock(redis_client, SESSION_ARCHIVE_LOCK, SESSION_ARCHIVE_INTERVAL) is None:
+            continue
+        try:
+            moved = await archive_finished_sessions(models.db)
+            if moved:
+                print(f"Archived {moved} finished sessions")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Session archive error: {str(e)}")
+
+async def main() -> None:
+    await models.init_db()
+    try:
+        print(f"Archived {await archive_finished_sessions(models.db)} finished sessions")
+    finally:
+        models.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
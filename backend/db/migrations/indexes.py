@@ -0,0 +1,86 @@
+
+"""
+MongoDB index definitions.
+
+Workers build these in the background after startup (see ENSURE_INDEXES_ON_STARTUP),
+so booting never waits on them. They can also be applied ahead of a deploy:
+
+    python -m backend.db.migrations.indexes
+"""
+
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from pymongo.errors import OperationFailure
+
+from backend.db import models
+
+INDEX_OPTIONS_CONFLICT = 85  # An index on the same keys exists with other options
+
+# collection -> [(keys, create_index options)]
+INDEXES: Dict[str, List[Tuple[Any, Dict[str, Any]]]] = {
+    "global_counters": [("word", {"unique": True})],
+    "game_sessions": [
+        ("session_id", {"unique": True}),
+        # Abandoned games expire; finished ones stay until they're archived
+        ("last_active_at", {
+            "expireAfterSeconds": models.SESSION_EXPIRE_AFTER,
+            "partialFilterExpression": {"status": "active"}
+        }),
+        ("finished_at", {"partialFilterExpression": {"status": "finished"}}),
+    ],
+    "verdicts": [([("guess", 1), ("word", 1)], {"unique": True})],
+}
+
+# "pending", "building", "ready" or "failed"
+status = "pending"
+
+def _key_pattern(keys: Any) -> Dict[str, Any]:
+    return {keys: 1} if isinstance(keys, str) else dict(keys)
+
+async def _create_index(database, collection: str, keys: Any, options: Dict[str, Any]) -> None:
+    try:
+        await database[collection].create_index(keys, **options)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT or "expireAfterSeconds" not in options:
+            raise
+        # The TTL changed (e.g. SESSION_EXPIRE_AFTER), which collMod can update in place
+        await database.command({
+            "collMod": collection,
+            "index": {"keyPattern": _key_pattern(keys), "expireAfterSeconds": options["expireAfterSeconds"]}
+        })
+
+async def ensure_indexes(database) -> None:
+    """Create every index (a no-op for indexes that already exist), carrying on past failures"""
+    failed = []
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await _create_index(database, collection, keys, options)
+            except Exception as e:
+                print(f"Index creation error on {collection} {keys}: {str(e)}")
+                failed.append(f"{collection} {keys}")
+    if failed:
+        raise RuntimeError(f"Could not create indexes: {', '.join(failed)}")
+
+async def ensure_indexes_in_background() -> None:
+    """Build indexes without failing the worker, recording the outcome in `status`"""
+    global status
+    status = "building"
+    try:
+        await ensure_indexes(models.db)
+        status = "ready"
+    except Exception as e:
+        print(f"Index creation error: {str(e)}")
+        status = "failed"
+
+async def main() -> None:
+    await models.init_db()
+    try:
+        await ensure_indexes(models.db)
+        print("Indexes are up to date")
+    finally:
+        models.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,54 +1,626 @@
 
 import os
+import json
+import time
 import uuid
+import asyncio
 import motor.motor_asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from typing import Dict, Any, Optional, List
 
+from backend.core.leaderboard import leaderboard
+from backend.core.metrics import timed_datastore
+
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DB_NAME = "what_beats_rock"
 
+# Write-behind batching of global counter increments
+COUNTER_WRITE_BEHIND = os.getenv("COUNTER_WRITE_BEHIND", "true").lower() == "true"
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "1"))  # Seconds between flushes
+COUNTER_FLUSH_BATCH_SIZE = int(os.getenv("COUNTER_FLUSH_BATCH_SIZE", "500"))  # Words per bulk_write
+COUNTER_KNOWN_SIZE = int(os.getenv("COUNTER_KNOWN_SIZE", "10000"))  # Persisted counts kept in memory
+COUNTER_DRAIN_TIMEOUT = float(os.getenv("COUNTER_DRAIN_TIMEOUT", "10"))  # Seconds a failed final flush is retried on shutdown
+
+# Hot session store in Redis
+SESSION_STORE_TTL = int(os.getenv("SESSION_STORE_TTL", "1800"))  # Idle seconds before a session leaves Redis
+SESSION_PERSIST_MODE = os.getenv("SESSION_PERSIST_MODE", "async")  # "write_through" or "async"
+SESSION_REHYDRATE_WAIT = float(os.getenv("SESSION_REHYDRATE_WAIT", "1"))  # Seconds to wait for other workers' writes when reloading
+SESSION_EXPIRE_AFTER = int(os.getenv("SESSION_EXPIRE_AFTER", "604800"))  # Idle seconds before an unfinished game is deleted
+
+# Give up on an unreachable server quickly instead of hanging requests
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))  # Connections per worker (backend.serve derives it)
+
 client = None
 db = None
 
 async def init_db():
-    """Initialize database connection"""
+    """
+    Initialize database connection. The client connects lazily on its first operation,
+    so this doesn't wait on the network; indexes live in backend.db.migrations.indexes.
+    """
     global client, db
-    client = motor.motor_asyncio.AsyncIOMotorClient(MONGODB_URL)
-    db = client[DB_NAME]
-    
-    # Ensure indexes
-    await db.global_counters.create_index("word", unique=True)
-    await db.game_sessions.create_index("session_id", unique=True)
+    if client is None:
+        client = motor.motor_asyncio.AsyncIOMotorClient(
+            MONGODB_URL, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS, maxPoolSize=MONGO_MAX_POOL_SIZE
+        )
+        db = client[DB_NAME]
+
+def close_db():
+    """Close the connection pool"""
+    global client, db
+    if client is not None:
+        client.close()
+    client = None
+    db = None
+
+async def ping_db(timeout: float) -> bool:
+    """Check that MongoDB answers within the timeout"""
+    if db is None:
+        return False
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=timeout)
+        return True
+    except Exception as e:
+        print(f"MongoDB ping error: {str(e)}")
+        return False
 
 async def create_game_session(session_id: Optional[str], data: Dict[str, Any]) -> str:
     """Create a new game session or update existing one"""
     if not session_id:
         session_id = str(uuid.uuid4())
     
-    # Add session_id to data
+    # Add session_id and lifecycle fields to data
     data["session_id"] = session_id
+    data.setdefault("status", "active")
     
     # Upsert the game session
-    await db.game_sessions.update_one(
-        {"session_id": session_id},
-        {"$set": data},
-        upsert=True
-    )
+    with timed_datastore("mongo", "upsert_session"):
+        await db.game_sessions.update_one(
+            {"session_id": session_id},
+            {"$set": {**data, "last_active_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
     
     return session_id
 
-async def get_game_session(session_id: str) -> Optional[Dict[str, Any]]:
-    """Get a game session by ID"""
+async def get_game_session(session_id: str, tail: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Get a game session by ID, with only the last `tail` guesses if given"""
     if not session_id:
         return None
     
-    result = await db.game_sessions.find_one({"session_id": session_id})
+    # Only the fields the game uses, so long chains aren't sent when only the tail is needed
+    projection = {"_id": 0, "session_id": 1, "current_word": 1, "score": 1, "status": 1, "guesses": {"$slice": -tail} if tail else 1}
+    with timed_datastore("mongo", "find_session"):
+        result = await db.game_sessions.find_one({"session_id": session_id}, projection)
+    
+    # Sessions created before lifecycle tracking have no status
+    if result is not None:
+        result.setdefault("status", "active")
     return result
 
+async def get_session_history(session_id: str, start: int, limit: int) -> Optional[Dict[str, Any]]:
+    """Get a session's current word, score and up to `limit` guesses from position `start` of the chain"""
+    projection = {"_id": 0, "current_word": 1, "score": 1, "guesses": {"$slice": [start, limit]}}
+    with timed_datastore("mongo", "find_history"):
+        return await db.game_sessions.find_one({"session_id": session_id}, projection)
+
+async def append_guess(session_id: str, guess: str, expected_word: str, tail: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    Atomically append a guess to a session's chain in one round-trip.
+    Returns the updated session (with only the last `tail` guesses), or None if the guess
+    was already in the chain, the chain moved past `expected_word` in the meantime or the game is finished.
+    """
+    with timed_datastore("mongo", "append_guess"):
+        return await db.game_sessions.find_one_and_update(
+            {"session_id": session_id, "current_word": expected_word, "guesses": {"$ne": guess}, "status": {"$ne": "finished"}},
+            {"$push": {"guesses": guess}, "$set": {"current_word": guess, "last_active_at": datetime.now(timezone.utc)}, "$inc": {"score": 1}},
+            projection={"_id": 0, "current_word": 1, "score": 1, "guesses": {"$slice": -tail}},
+            return_document=ReturnDocument.AFTER
+        )
+
+async def append_guesses(session_id: str, guesses: List[str], expected_word: str) -> bool:
+    """
+    Atomically append several guesses in one write, e.g. a WebSocket checkpoint.
+    Returns False if any of them is already in the chain, the chain moved past `expected_word`
+    or the game is finished.
+    """
+    with timed_datastore("mongo", "append_guesses"):
+        result = await db.game_sessions.update_one(
+            {"session_id": session_id, "current_word": expected_word, "guesses": {"$nin": guesses}, "status": {"$ne": "finished"}},
+            {
+                "$push": {"guesses": {"$each": guesses}},
+                "$set": {"current_word": guesses[-1], "last_active_at": datetime.now(timezone.utc)},
+                "$inc": {"score": len(guesses)}
+            }
+        )
+    return result.modified_count == 1
+
+async def write_guess_at(session_id: str, guess: str, score: int) -> bool:
+    """
+    Write a guess the Redis store accepted as the `score`th of the chain. Each write carries
+    its position, so writes for one session may land in any order (e.g. from different workers).
+    Returns False if the session isn't in Mongo.
+    """
+    with timed_datastore("mongo", "write_guess"):
+        result = await db.game_sessions.update_one(
+            {"session_id": session_id},
+            {"$set": {f"guesses.{score}": guess, "last_active_at": datetime.now(timezone.utc)}, "$max": {"score": score}}
+        )
+        if result.matched_count == 0:
+            return False
+        # Only the furthest guess written so far is the current word
+        await db.game_sessions.update_one({"session_id": session_id, "score": score}, {"$set": {"current_word": guess}})
+    return True
+
+async def mark_session_finished(session_id: str) -> bool:
+    """Mark a session finished that the Redis store already checked, whatever chain Mongo has so far"""
+    now = datetime.now(timezone.utc)
+    with timed_datastore("mongo", "finish_session"):
+        result = await db.game_sessions.update_one(
+            {"session_id": session_id},
+            {"$set": {"status": "finished", "last_active_at": now}, "$min": {"finished_at": now}}
+        )
+    return result.matched_count == 1
+
+def _chain_complete(session: Dict[str, Any]) -> bool:
+    guesses = session.get("guesses", [])
+    return len(guesses) == session.get("score", 0) + 1 and None not in guesses
+
+async def finish_game_session(session_id: str, guess: str, expected_word: str, tail: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    Atomically mark a session finished because `guess` repeats a word of its chain.
+    Returns the finished session (with only the last `tail` guesses), or None if the chain
+    moved past `expected_word` or doesn't contain the guess. Finishing twice keeps the first finished_at.
+    """
+    now = datetime.now(timezone.utc)
+    with timed_datastore("mongo", "finish_session"):
+        return await db.game_sessions.find_one_and_update(
+            {"session_id": session_id, "current_word": expected_word, "guesses": guess},
+            {"$set": {"status": "finished", "last_active_at": now}, "$min": {"finished_at": now}},
+            projection={"_id": 0, "current_word": 1, "score": 1, "status": 1, "guesses": {"$slice": -tail}},
+            return_document=ReturnDocument.AFTER
+        )
+
+# Only load a session into Redis if no other request loaded it first
+_LOAD_SESSION_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 1 then
+    return 0
+end
+redis.call("hset", KEYS[1], "current_word", ARGV[2], "score", ARGV[3], "status", ARGV[4])
+for i = 5, #ARGV do
+    redis.call("rpush", KEYS[2], ARGV[i])
+    redis.call("sadd", KEYS[3], ARGV[i])
+end
+for i = 1, 3 do
+    redis.call("expire", KEYS[i], ARGV[1])
+end
+return 1
+"""
+
+# Same checks as append_guess: -3 = finished, -2 = not loaded, -1 = chain moved on, 0 = duplicate
+_APPEND_GUESS_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 0 then
+    return -2
+end
+if redis.call("hget", KEYS[1], "status") == "finished" then
+    return -3
+end
+if redis.call("hget", KEYS[1], "current_word") ~= ARGV[2] then
+    return -1
+end
+if redis.call("sismember", KEYS[3], ARGV[1]) == 1 then
+    return 0
+end
+redis.call("rpush", KEYS[2], ARGV[1])
+redis.call("sadd", KEYS[3], ARGV[1])
+redis.call("hset", KEYS[1], "current_word", ARGV[1])
+local score = redis.call("hincrby", KEYS[1], "score", 1)
+for i = 1, 3 do
+    redis.call("expire", KEYS[i], ARGV[3])
+end
+return {score, redis.call("lrange", KEYS[2], -tonumber(ARGV[4]), -1)}
+"""
+
+# Same checks as finish_game_session: -2 = not loaded, -1 = chain moved on or no duplicate
+_FINISH_SESSION_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 0 then
+    return -2
+end
+if redis.call("hget", KEYS[1], "current_word") ~= ARGV[2] or redis.call("sismember", KEYS[3], ARGV[1]) == 0 then
+    return -1
+end
+redis.call("hset", KEYS[1], "status", "finished")
+for i = 1, 3 do
+    redis.call("expire", KEYS[i], ARGV[3])
+end
+return {tonumber(redis.call("hget", KEYS[1], "score")), redis.call("lrange", KEYS[2], -tonumber(ARGV[4]), -1)}
+"""
+
+class SessionStore:
+    """
+    Keeps active sessions in Redis (a hash, the ordered chain as a list and the same
+    guesses as a set) with an idle TTL, persisting every change to Mongo. Sessions that
+    aren't in Redis are loaded lazily from Mongo. Without Redis it reads and writes Mongo directly.
+    """
+    
+    def __init__(self, ttl: int, persist_mode: str):
+        self.ttl = ttl
+        self.persist_mode = persist_mode  # "write_through" or "async"
+        self.redis = None
+        self._pending_writes: Dict[str, asyncio.Task] = {}
+    
+    def attach(self, redis_client) -> None:
+        """Start keeping sessions in Redis"""
+        self.redis = redis_client
+        if redis_client is not None:
+            # Registered scripts are called by SHA (EVALSHA) instead of sending their body each time
+            self._load_script = redis_client.register_script(_LOAD_SESSION_SCRIPT)
+            self._append_script = redis_client.register_script(_APPEND_GUESS_SCRIPT)
+            self._finish_script = redis_client.register_script(_FINISH_SESSION_SCRIPT)
+    
+    @staticmethod
+    def _keys(session_id: str) -> List[str]:
+        return [f"session:{{{session_id}}}", f"session:{{{session_id}}}:guesses", f"session:{{{session_id}}}:seen"]
+    
+    async def create(self, session_id: Optional[str], data: Dict[str, Any]) -> str:
+        """Create a session in Mongo and preload it into Redis"""
+        session_id = await create_game_session(session_id, data)
+        if self.redis is not None:
+            await self._load_into_redis(session_id, data)
+        return session_id
+    
+    async def get(self, session_id: str, tail: Optional[int] = 5) -> Optional[Dict[str, Any]]:
+        """Get a session's current word, score and last `tail` guesses (the whole chain if None)"""
+        if not session_id:
+            return None
+        
+        if self.redis is None:
+            return await get_game_session(session_id, tail)
+        
+        keys = self._keys(session_id)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hgetall(keys[0])
+            pipe.lrange(keys[1], -tail if tail else 0, -1)
+            for key in keys:
+                pipe.expire(key, self.ttl)
+            with timed_datastore("redis", "session_get"):
+                state, guesses = (await pipe.execute())[:2]
+        except Exception as e:
+            print(f"Redis session get error: {str(e)}")
+            return await get_game_session(session_id, tail)
+        
+        if state:
+            return {
+                "session_id": session_id,
+                "current_word": state["current_word"],
+                "score": int(state["score"]),
+                "status": state.get("status", "active"),
+                "guesses": guesses
+            }
+        
+        # Idle session, rehydrate it from Mongo
+        session = await self._rehydrate(session_id)
+        if session is not None and tail:
+            session["guesses"] = session["guesses"][-tail:]
+        return session
+    
+    async def history(self, session_id: str, start: int, limit: int) -> Optional[Dict[str, Any]]:
+        """Get one page of a session's chain, from Redis if the session is hot and from Mongo otherwise"""
+        if self.redis is not None:
+            keys = self._keys(session_id)
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hgetall(keys[0])
+                pipe.lrange(keys[1], start, start + limit - 1)
+                with timed_datastore("redis", "session_history"):
+                    state, guesses = await pipe.execute()
+                if state:
+                    return {"current_word": state["current_word"], "score": int(state["score"]), "guesses": guesses}
+            except Exception as e:
+                print(f"Redis session history error: {str(e)}")
+        
+        # Not in Redis, so Mongo is current once our queued writes land
+        await self.wait_for_writes(session_id)
+        history = await get_session_history(session_id, start, limit)
+        if history is None:
+            # Import here to avoid circular imports
+            from backend.db.archive import get_archived_history
+            history = await get_archived_history(db, session_id, start, limit)
+        return history
+    
+    async def append_guess(self, session_id: str, guess: str, expected_word: str, tail: int = 5) -> Optional[Dict[str, Any]]:
+        """Same contract as the module-level append_guess, served from Redis when possible"""
+        if self.redis is None:
+            return await append_guess(session_id, guess, expected_word, tail)
+        
+        try:
+            with timed_datastore("redis", "session_append"):
+                result = await self._append_script(self._keys(session_id), [guess, expected_word, self.ttl, tail])
+            if result == -2 and await self._rehydrate(session_id) is not None:
+                result = await self._append_script(self._keys(session_id), [guess, expected_word, self.ttl, tail])
+        except Exception as e:
+            print(f"Redis session append error: {str(e)}")
+            return await append_guess(session_id, guess, expected_word, tail)
+        
+        if not isinstance(result, list):
+            return None
+        
+        score, guesses = result
+        if self.persist_mode == "async":
+            self._persist_later(session_id, guess, int(score))
+        elif not await self._persist(session_id, guess, int(score)):
+            return None
+        
+        return {"current_word": guess, "score": int(score), "guesses": guesses}
+    
+    async def finish(self, session_id: str, guess: str, expected_word: str, tail: int = 5) -> Optional[Dict[str, Any]]:
+        """Same contract as finish_game_session, applied to the Redis copy too so later guesses are turned away there"""
+        if self.redis is None:
+            return await finish_game_session(session_id, guess, expected_word, tail)
+        
+        try:
+            with timed_datastore("redis", "session_finish"):
+                result = await self._finish_script(self._keys(session_id), [guess, expected_word, self.ttl, tail])
+            if result == -2 and await self._rehydrate(session_id) is not None:
+                result = await self._finish_script(self._keys(session_id), [guess, expected_word, self.ttl, tail])
+        except Exception as e:
+            print(f"Redis session finish error: {str(e)}")
+            await self.evict(session_id)
+            return await finish_game_session(session_id, guess, expected_word, tail)
+        
+        if not isinstance(result, list):
+            return None
+        
+        # Finishing happens once per game, so it's always written through. Redis already checked
+        # the duplicate, and guesses other workers are still writing may not be in Mongo yet.
+        try:
+            if not await mark_session_finished(session_id):
+                print(f"Session {session_id} is missing from Mongo, dropping the Redis copy")
+                await self.evict(session_id)
+        except Exception as e:
+            print(f"Session finish error: {str(e)}")
+            await self.evict(session_id)
+        
+        score, guesses = result
+        return {"current_word": expected_word, "score": int(score), "status": "finished", "guesses": guesses}
+    
+    async def checkpoint(self, session_id: str, guesses: List[str], expected_word: str) -> bool:
+        """Write guesses that were held in memory (e.g. by a WebSocket connection), in order"""
+        if self.redis is None:
+            try:
+                return await append_guesses(session_id, guesses, expected_word)
+            except Exception as e:
+                print(f"Session checkpoint error: {str(e)}")
+                return False
+        
+        # Through Redis like any other guess, so other readers see them at once and their
+        # Mongo writes go to their own positions in the chain alongside other workers' writes
+        for guess in guesses:
+            if await self.append_guess(session_id, guess, expected_word) is None:
+                return False
+            expected_word = guess
+        return True
+    
+    async def _persist(self, session_id: str, guess: str, score: int) -> bool:
+        try:
+            if await write_guess_at(session_id, guess, score):
+                return True
+            print(f"Session {session_id} is missing from Mongo, dropping the Redis copy")
+        except Exception as e:
+            print(f"Session persist error: {str(e)}")
+        
+        # Mongo is authoritative, reload from it on the next read
+        await self.evict(session_id)
+        return False
+    
+    def _persist_later(self, session_id: str, guess: str, score: int) -> None:
+        # Writes can land in any order, but chaining them lets wait_for_writes wait for the last one
+        previous = self._pending_writes.get(session_id)
+        
+        async def write():
+            if previous is not None:
+                await asyncio.wait([previous])
+            await self._persist(session_id, guess, score)
+        
+        task = asyncio.ensure_future(write())
+        self._pending_writes[session_id] = task
+        
+        def done(_):
+            if self._pending_writes.get(session_id) is task:
+                del self._pending_writes[session_id]
+        task.add_done_callback(done)
+    
+    async def wait_for_writes(self, session_id: str) -> None:
+        """Wait until a session's queued Mongo writes have landed"""
+        pending = self._pending_writes.get(session_id)
+        if pending is not None:
+            await asyncio.wait([pending])
+    
+    async def _rehydrate(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Let queued writes land first so we don't load a stale chain
+        await self.wait_for_writes(session_id)
+        
+        # Other workers' writes may still be landing, leaving the chain short or with gaps
+        session = await get_game_session(session_id)
+        deadline = time.monotonic() + SESSION_REHYDRATE_WAIT
+        while session is not None and not _chain_complete(session) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            session = await get_game_session(session_id)
+        
+        if session is not None:
+            if not _chain_complete(session):
+                print(f"Session {session_id} has guesses missing in Mongo, loading what is there")
+                session["guesses"] = [guess for guess in session["guesses"] if guess is not None]
+            await self._load_into_redis(session_id, session)
+        return session
+    
+    async def _load_into_redis(self, session_id: str, session: Dict[str, Any]) -> None:
+        try:
+            await self._load_script(
+                self._keys(session_id),
+                [self.ttl, session["current_word"], session.get("score", 0), session.get("status", "active"), *session["guesses"]]
+            )
+        except Exception as e:
+            print(f"Redis session load error: {str(e)}")
+    
+    async def evict(self, session_id: str) -> None:
+        """Drop a session from Redis, e.g. after a change made directly in Mongo"""
+        try:
+            await self.redis.delete(*self._keys(session_id))
+        except Exception as e:
+            print(f"Redis session evict error: {str(e)}")
+    
+    async def flush(self) -> None:
+        """Wait for queued Mongo writes to finish"""
+        while self._pending_writes:
+            await asyncio.wait(list(self._pending_writes.values()))
+
+session_store = SessionStore(SESSION_STORE_TTL, SESSION_PERSIST_MODE)
+
+class CounterAggregator:
+    """Accumulates global counter increments in memory and flushes them to Mongo with bulk $inc writes"""
+    
+    def __init__(self, flush_interval: float, batch_size: int, known_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.known_size = known_size
+        self._pending: Dict[str, int] = {}  # Increments not yet sent to Mongo
+        self._flushing: Dict[str, int] = {}  # Increments being sent right now
+        self._known: "OrderedDict[str, int]" = OrderedDict()  # Last counts read from Mongo
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def knows(self, word: str) -> bool:
+        return word in self._known
+    
+    def remember(self, word: str, count: int) -> None:
+        """Record a count read from Mongo, dropping the least recently used word if full"""
+        self._known[word] = count
+        self._known.move_to_end(word)
+        while len(self._known) > self.known_size:
+            self._known.popitem(last=False)
+    
+    def count(self, word: str) -> int:
+        """Approximate count: last persisted value plus increments not yet persisted"""
+        return self._known.get(word, 0) + self._flushing.get(word, 0) + self._pending.get(word, 0)
+    
+    def increment(self, word: str) -> int:
+        self._pending[word] = self._pending.get(word, 0) + 1
+        if len(self._pending) >= self.batch_size and not self._flush_lock.locked():
+            asyncio.ensure_future(self.flush())
+        return self.count(word)
+    
+    async def flush(self) -> None:
+        """Write all pending increments to Mongo. Failed increments stay pending."""
+        async with self._flush_lock:
+            self._flushing, self._pending = self._pending, {}
+            items = list(self._flushing.items())
+            written: List[str] = []
+            
+            try:
+                for start in range(0, len(items), self.batch_size):
+                    chunk = items[start:start + self.batch_size]
+                    failed = set()
+                    try:
+                        with timed_datastore("mongo", "counter_flush"):
+                            await db.global_counters.bulk_write(
+                                [UpdateOne({"word": word}, {"$inc": {"count": n}}, upsert=True) for word, n in chunk],
+                                ordered=False
+                            )
+                    except BulkWriteError as e:
+                        print(f"Counter flush error: {str(e)}")
+                        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                    except Exception as e:
+                        # Nothing is known to be written, keep this chunk and the rest for the next flush
+                        print(f"Counter flush error: {str(e)}")
+                        for word, n in items[start:]:
+                            del self._flushing[word]
+                            self._pending[word] = self._pending.get(word, 0) + n
+                        break
+                    
+                    # Move each word out of _flushing as its write settles, so count() never sees it twice
+                    for index, (word, n) in enumerate(chunk):
+                        del self._flushing[word]
+                        if index in failed:
+                            self._pending[word] = self._pending.get(word, 0) + n
+                        else:
+                            written.append(word)
+                            if word in self._known:
+                                self._known[word] += n
+            finally:
+                self._flushing = {}
+            
+            # Pick up increments made by other workers
+            if written:
+                try:
+                    async for doc in db.global_counters.find({"word": {"$in": written}}, {"word": 1, "count": 1}):
+                        if doc["word"] in self._known:
+                            self._known[doc["word"]] = doc.get("count", 0)
+                except Exception as e:
+                    print(f"Counter refresh error: {str(e)}")
+    
+    def reset(self) -> None:
+        """Forget all pending increments and known counts"""
+        self._pending.clear()
+        self._known.clear()
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+    
+    def start(self) -> None:
+        """Start the periodic flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self, timeout: float = COUNTER_DRAIN_TIMEOUT) -> None:
+        """Stop the flush loop and write out everything still pending, retrying for up to `timeout` seconds"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        deadline = time.monotonic() + timeout
+        delay = 0.1
+        await self.flush()
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(min(delay, deadline - time.monotonic()))
+            delay = min(delay * 2, 2)
+            await self.flush()
+        
+        if self._pending:
+            # They die with the process, so at least say exactly which counts were lost
+            print(f"Counter increments dropped on shutdown: {json.dumps(self._pending, sort_keys=True)}")
+
+counters = CounterAggregator(COUNTER_FLUSH_INTERVAL, COUNTER_FLUSH_BATCH_SIZE, COUNTER_KNOWN_SIZE)
+
+async def _load_counter(word: str) -> None:
+    with timed_datastore("mongo", "find_counter"):
+        result = await db.global_counters.find_one({"word": word})
+    counters.remember(word, result.get("count", 0) if result else 0)
+
 async def update_global_counter(word: str) -> int:
     """Update global counter for a word and return new count"""
+    word = word.lower()
+    await leaderboard.record(word)
+    
+    if COUNTER_WRITE_BEHIND:
+        # Counts are approximate until the next flush
+        if not counters.knows(word):
+            await _load_counter(word)
+        return counters.increment(word)
+    
     result = await db.global_counters.find_one_and_update(
-        {"word": word.lower()},
+        {"word": word},
         {"$inc": {"count": 1}},
         upsert=True,
         return_document=True
@@ -58,10 +630,18 @@ async def update_global_counter(word: str) -> int:
 
 async def get_global_counter(word: str) -> int:
     """Get global counter for a word"""
-    result = await db.global_counters.find_one({"word": word.lower()})
+    word = word.lower()
+    
+    if COUNTER_WRITE_BEHIND:
+        if not counters.knows(word):
+            await _load_counter(word)
+        return counters.count(word)
+    
+    result = await db.global_counters.find_one({"word": word})
     return result.get("count", 0) if result else 0
 
 async def reset_game_state():
     """Reset all game state - useful for testing"""
+    counters.reset()
     await db.game_sessions.delete_many({})
     await db.global_counters.delete_many({})
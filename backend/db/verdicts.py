@@ -0,0 +1,130 @@
+
+"""
+Durable verdict store: every judged pair is an edge of a directed "beats" graph in the
+`verdicts` collection, one document per (guess, word) with the verdict, where it came
+from and when. It sits behind the Redis cache, so a pair costs one AI call ever rather
+than one per cache TTL. A Bloom filter of the stored pairs lets lookups for pairs that
+were never judged skip Mongo. Each worker has its own filter, kept current with pairs
+saved by the others through Redis pub/sub; while it may be missing some (before it's
+loaded, without Redis or while disconnected) every lookup goes to Mongo.
+"""
+
+import os
+import json
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from backend.core.bloom import BloomFilter
+from backend.core.canonical import canonicalize
+from backend.core.metrics import timed_datastore, verdict_cache_lookups
+from backend.db import models
+
+VERDICT_STORE = os.getenv("VERDICT_STORE", "true").lower() == "true"  # Keep verdicts in Mongo behind the cache
+VERDICT_FILTER_CAPACITY = int(os.getenv("VERDICT_FILTER_CAPACITY", "1000000"))  # Pairs before false positives rise
+VERDICT_FILTER_ERROR_RATE = float(os.getenv("VERDICT_FILTER_ERROR_RATE", "0.01"))  # Expected false positive rate
+VERDICT_CHANNEL = "verdicts:saved"
+VERDICT_FILTER_CLOCK_SKEW = 60  # Seconds of overlap when catching up on pairs saved while disconnected
+
+known_pairs = BloomFilter(VERDICT_FILTER_CAPACITY, VERDICT_FILTER_ERROR_RATE)
+
+# The filter can only rule pairs out while it holds everything in Mongo
+_filter_ready = False
+
+def _pair(guess: str, word: str) -> str:
+    return f"{canonicalize(guess)}\x00{canonicalize(word)}"
+
+def get_verdict_store_stats() -> Dict[str, Any]:
+    """Get the Bloom filter's state"""
+    return {"enabled": VERDICT_STORE, "filter_ready": _filter_ready, **known_pairs.stats()}
+
+async def load_known_pairs(since: Optional[datetime] = None) -> None:
+    """Add stored pairs to the Bloom filter, all of them or those first judged since `since`"""
+    query = {} if since is None else {"created_at": {"$gte": since}}
+    with timed_datastore("mongo", "load_verdict_pairs"):
+        async for doc in models.db.verdicts.find(query, {"_id": 0, "guess": 1, "word": 1}):
+            known_pairs.add(_pair(doc["guess"], doc["word"]))
+
+async def sync_known_pairs(redis_client) -> None:
+    """Fill the Bloom filter and keep it current with pairs other workers save. Runs until cancelled."""
+    global _filter_ready
+    if not VERDICT_STORE or redis_client is None:
+        return
+
+    synced_until = None  # When the filter last held every stored pair
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            # Subscribe first, so pairs saved during the load arrive as messages
+            await pubsub.subscribe(VERDICT_CHANNEL)
+            await load_known_pairs(None if synced_until is None else synced_until - timedelta(seconds=VERDICT_FILTER_CLOCK_SKEW))
+            _filter_ready = True
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    data = json.loads(message["data"])
+                    known_pairs.add(_pair(data["guess"], data["word"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Verdict filter sync error: {str(e)}")
+            await asyncio.sleep(1)
+        finally:
+            # Messages are lost while unsubscribed, so catch up from Mongo on reconnect
+            if _filter_ready:
+                synced_until = datetime.now(timezone.utc)
+            _filter_ready = False
+            await pubsub.aclose()
+
+async def find_verdict(guess: str, word: str) -> Optional[Dict[str, Any]]:
+    """Get a stored verdict for the pair, or None if it was never judged"""
+    if not VERDICT_STORE:
+        return None
+
+    if _filter_ready and _pair(guess, word) not in known_pairs:
+        verdict_cache_lookups.inc("filter", "skip")
+        return None
+
+    try:
+        with timed_datastore("mongo", "find_verdict"):
+            result = await models.db.verdicts.find_one(
+                {"guess": canonicalize(guess), "word": canonicalize(word)},
+                {"_id": 0, "valid": 1, "explanation": 1}
+            )
+    except Exception as e:
+        print(f"Verdict lookup error: {str(e)}")
+        return None
+
+    verdict_cache_lookups.inc("mongo", "hit" if result else "miss")
+    return result
+
+async def save_verdict(guess: str, word: str, verdict: Dict[str, Any], source: str, redis_client=None) -> None:
+    """Store a verdict with its provenance, keeping when the pair was first judged, and tell the other workers' filters"""
+    if not VERDICT_STORE:
+        return
+
+    now = datetime.now(timezone.utc)
+    try:
+        with timed_datastore("mongo", "save_verdict"):
+            await models.db.verdicts.update_one(
+                {"guess": canonicalize(guess), "word": canonicalize(word)},
+                {
+                    "$set": {
+                        "valid": bool(verdict["valid"]),
+                        "explanation": verdict["explanation"],
+                        "source": source,
+                        "updated_at": now
+                    },
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            )
+        known_pairs.add(_pair(guess, word))
+    except Exception as e:
+        print(f"Verdict save error: {str(e)}")
+        return
+
+    if redis_client is not None:
+        try:
+            await redis_client.publish(VERDICT_CHANNEL, json.dumps({"guess": canonicalize(guess), "word": canonicalize(word)}))
+        except Exception as e:
+            print(f"Redis verdict publish error: {str(e)}")
@@ -1,13 +1,29 @@
 
 from fastapi import FastAPI, HTTPException, Depends, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
+import os
 import time
+import asyncio
 from typing import Optional
 
-from backend.api import game_routes
-from backend.core.cache import init_redis_pool
-from backend.db.models import init_db
+from backend.api import game_routes, ws_routes
+from backend.core.cache import (
+    init_redis_pool, close_redis_pool, ping_redis, listen_for_invalidations, get_cache_stats, check_rate_limit, get_rate_limit_rule
+)
+from backend.core.ai_client import get_ai_queue_stats, get_ai_batch_stats, get_ai_resilience_stats, ai_configured, drain_ai_calls
+from backend.core.metrics import (
+    REGISTRY, Gauge, METRICS_TIMING_HEADERS, http_request_seconds, render_metrics, server_timing_header, start_request
+)
+from backend.core.leaderboard import leaderboard
+from backend.core.prefetch import prefetcher, PREFETCH
+from backend.core.static import StaticAssetsMiddleware
+from backend.db import models
+from backend.db.models import init_db, close_db, ping_db, counters, session_store
+from backend.db.verdicts import sync_known_pairs, get_verdict_store_stats
+from backend.db.archive import run_archiver
+from backend.db.migrations import indexes
+from backend.db.migrations.indexes import ensure_indexes_in_background
 
 app = FastAPI(title="What Beats Rock - AI Game")
 
@@ -23,45 +39,138 @@ app.add_middleware(
 # Rate limiting middleware
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    # Get client IP
-    client_ip = request.client.host
-    
-    # Simple in-memory rate limiting (in production, use Redis for this)
-    # Allow 10 requests per minute per IP
-    current_time = int(time.time())
-    request_key = f"{client_ip}:{current_time // 60}"
+    # Static assets and health checks are not limited
+    rule = get_rate_limit_rule(request.url.path)
+    if rule is None:
+        return await call_next(request)
     
-    if hasattr(app.state, "rate_limits"):
-        rate_limits = app.state.rate_limits
-    else:
-        rate_limits = {}
-        app.state.rate_limits = rate_limits
+    prefix, limit, window = rule
+    client_ip = request.client.host if request.client else "unknown"
     
-    if request_key in rate_limits:
-        rate_limits[request_key] += 1
-        if rate_limits[request_key] > 100:  # Allow 100 requests per minute
-            return HTTPException(status_code=429, detail="Too many requests")
-    else:
-        rate_limits[request_key] = 1
+    # Sliding window shared by all workers through Redis, with a local fallback
+    if not await check_rate_limit(getattr(app.state, "redis", None), client_ip, limit, window, scope=prefix):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many requests"},
+            headers={"Retry-After": str(window)}
+        )
     
     response = await call_next(request)
     return response
 
+# Metrics middleware (added last so it also times the rate limiter)
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    sampled = start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    
+    route = request.scope.get("route")
+    http_request_seconds.observe(elapsed, getattr(route, "path", "unmatched"), request.method, str(response.status_code))
+    
+    if sampled and METRICS_TIMING_HEADERS:
+        response.headers["Server-Timing"] = server_timing_header(elapsed)
+    return response
+
+# Frontend assets (added last so it runs first and asset requests skip the middleware above)
+app.add_middleware(StaticAssetsMiddleware)
+
 # Mount API routes
 app.include_router(game_routes.router)
+app.include_router(ws_routes.router)
 
-# Mount static files for frontend
-app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
+# Seconds each dependency gets to answer a readiness check
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "1"))
+# Build MongoDB indexes in the background after startup (otherwise run backend.db.migrations.indexes)
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+# Seconds AI calls still running at shutdown (e.g. for a coalesced lookup) get to finish
+AI_DRAIN_TIMEOUT = float(os.getenv("AI_DRAIN_TIMEOUT", "10"))
 
 @app.on_event("startup")
 async def startup_db_client():
+    # Nothing here waits on the network: clients connect on first use
+    # and indexes are built in the background
     await init_db()
+    counters.start()
     app.state.redis = await init_redis_pool()
+    session_store.attach(app.state.redis)
+    leaderboard.attach(app.state.redis)
+    prefetcher.attach(app.state.redis)
+    if PREFETCH:
+        prefetcher.start()
+    # Keep every worker's local cache consistent with Redis
+    app.state.cache_listener = asyncio.create_task(listen_for_invalidations(app.state.redis))
+    # Lookups go to Mongo until the filter of stored verdict pairs is loaded
+    app.state.verdict_filter_sync = asyncio.create_task(sync_known_pairs(app.state.redis))
+    # Seed the all-time leaderboard from global_counters the first time
+    app.state.leaderboard_backfill = asyncio.create_task(leaderboard.backfill(models.db))
+    # Move finished games out of game_sessions
+    app.state.session_archiver = asyncio.create_task(run_archiver(app.state.redis))
+    
+    if ENSURE_INDEXES_ON_STARTUP:
+        app.state.index_builder = asyncio.create_task(ensure_indexes_in_background())
+
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    for task_name in ("cache_listener", "verdict_filter_sync", "leaderboard_backfill", "session_archiver", "index_builder"):
+        if hasattr(app.state, task_name):
+            getattr(app.state, task_name).cancel()
+    
+    await prefetcher.stop()
+    if not await drain_ai_calls(AI_DRAIN_TIMEOUT):
+        print("Shutting down with AI calls still in flight")
+    
+    # Write out buffered counter increments and queued session writes before closing the pools
+    await counters.stop()
+    await session_store.flush()
+    
+    if hasattr(app.state, "redis"):
+        await close_redis_pool(app.state.redis)
+    close_db()
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Liveness only: the process is up and serving. Dependencies are checked by /ready.
+    return {"status": "healthy", "ai_queue": get_ai_queue_stats(), "ai_batches": get_ai_batch_stats(), "ai_resilience": get_ai_resilience_stats(), "local_cache": get_cache_stats(), "verdict_store": get_verdict_store_stats(), "prefetch": prefetcher.stats()}
+
+@app.get("/ready")
+async def readiness_check():
+    mongo_ok, redis_ok = await asyncio.gather(
+        ping_db(READY_TIMEOUT),
+        ping_redis(getattr(app.state, "redis", None), READY_TIMEOUT)
+    )
+    checks = {
+        "mongo": mongo_ok,
+        "redis": redis_ok,
+        "ai": ai_configured(),
+        "indexes": indexes.status
+    }
+    ready = mongo_ok and redis_ok and checks["ai"]
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", "checks": checks}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+REGISTRY.register(Gauge(
+    "ai_queue_calls", "AI calls in flight and waiting for a slot",
+    lambda: {(state,): get_ai_queue_stats()[state] for state in ("in_flight", "waiting")}, ("state",)))
+REGISTRY.register(Gauge(
+    "ai_circuit_open", "1 while the AI circuit breaker is rejecting calls",
+    lambda: {(): 0 if get_ai_resilience_stats()["circuit"] == "closed" else 1}))
+REGISTRY.register(Gauge(
+    "websocket_connections", "Open WebSocket game channels in this worker",
+    lambda: {(): ws_routes.get_ws_stats()["connections"]}))
+REGISTRY.register(Gauge(
+    "local_cache_entries", "Entries in this worker's local verdict cache",
+    lambda: {(): get_cache_stats()["size"]}))
 
+# Development server with auto-reload; production uses backend.serve
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
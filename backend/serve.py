@@ -0,0 +1,111 @@
+
+"""
+Production server: several uvicorn worker processes sharing one port.
+
+Each worker is a separate process with its own Motor, Redis and AI limits, so the
+node-wide budgets below are split between workers before they start (settings given
+explicitly, e.g. MONGO_MAX_POOL_SIZE, are left alone). On SIGTERM a worker stops
+accepting connections, gives in-flight requests up to WEB_DRAIN_TIMEOUT seconds, then
+waits for AI calls still running (AI_DRAIN_TIMEOUT) before closing its pools. Workers
+are recycled after WEB_MAX_REQUESTS requests, jittered so they don't restart together.
+Without WEB_WORKERS there is one worker per core the process may use: its CPU affinity,
+capped by the container's cgroup CPU quota.
+
+    WEB_WORKERS=4 python -m backend.serve
+"""
+
+import os
+import math
+import importlib.util
+from typing import Dict, Optional
+
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")  # Interface to listen on
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))  # Port to listen on
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))  # Worker processes, one per available core if 0
+WEB_LOOP = os.getenv("WEB_LOOP", "auto")  # auto, uvloop or asyncio
+WEB_HTTP = os.getenv("WEB_HTTP", "auto")  # auto, httptools or h11
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))  # Requests before a worker is recycled, never if 0
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "0"))  # Random extra requests per worker before recycling
+WEB_DRAIN_TIMEOUT = int(os.getenv("WEB_DRAIN_TIMEOUT", "30"))  # Seconds in-flight requests get on shutdown
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))  # Seconds idle connections are kept open
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "2048"))  # Connections waiting to be accepted
+MONGO_POOL_BUDGET = int(os.getenv("MONGO_POOL_BUDGET", "200"))  # Mongo connections for the whole node
+REDIS_POOL_BUDGET = int(os.getenv("REDIS_POOL_BUDGET", "400"))  # Redis connections for the whole node
+AI_CONCURRENCY_BUDGET = int(os.getenv("AI_CONCURRENCY_BUDGET", "0"))  # AI calls in flight for the whole node, unsplit if 0
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """CPUs allowed by the cgroup quota (e.g. a container's --cpus), or None if unlimited"""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    # cgroup v1: a quota of -1 means unlimited
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_cpus() -> int:
+    """Cores this process may run on, capped by the cgroup quota; os.cpu_count() reports the host's"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+def worker_count() -> int:
+    return WEB_WORKERS or available_cpus()
+
+def resolve(choice: str, fast: str, fallback: str) -> str:
+    """Use the fast implementation when asked to, or on auto when it's installed"""
+    if choice != "auto":
+        return choice
+    return fast if importlib.util.find_spec(fast) else fallback
+
+def pool_sizes(workers: int) -> Dict[str, str]:
+    """Split the node budgets between workers through the environment the workers inherit"""
+    sizes = {
+        "MONGO_MAX_POOL_SIZE": str(max(1, MONGO_POOL_BUDGET // workers)),
+        "REDIS_MAX_CONNECTIONS": str(max(1, REDIS_POOL_BUDGET // workers)),
+    }
+    if AI_CONCURRENCY_BUDGET:
+        sizes["AI_MAX_CONCURRENCY"] = str(max(1, AI_CONCURRENCY_BUDGET // workers))
+    return {name: os.environ.setdefault(name, value) for name, value in sizes.items()}
+
+def main() -> None:
+    import uvicorn
+
+    workers = worker_count()
+    loop = resolve(WEB_LOOP, "uvloop", "asyncio")
+    http = resolve(WEB_HTTP, "httptools", "h11")
+    sizes = pool_sizes(workers)
+    print(f"Serving on {WEB_HOST}:{WEB_PORT} with {workers} workers ({loop}, {http}), per worker: "
+          + ", ".join(f"{name}={value}" for name, value in sizes.items()), flush=True)
+
+    uvicorn.run(
+        "backend.main:app",
+        host=WEB_HOST,
+        port=WEB_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        limit_max_requests=WEB_MAX_REQUESTS or None,
+        limit_max_requests_jitter=WEB_MAX_REQUESTS_JITTER,
+        timeout_graceful_shutdown=WEB_DRAIN_TIMEOUT,
+        timeout_keep_alive=WEB_KEEPALIVE,
+        backlog=WEB_BACKLOG,
+        proxy_headers=True
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+
+"""
+Report how much input canonicalization shrinks the key space on a traffic sample.
+
+The sample is either plain text (one guess per line) or JSONL with a "guess" and
+optionally a "word" field, in which case verdict cache keys are compared too:
+
+    python -m backend.tools.canonical_report guesses.txt
+    python -m backend.tools.canonical_report traffic.jsonl --top 20
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.core.canonical import canonicalize
+
+def legacy_key(text: str) -> str:
+    """What guesses were keyed by before canonicalization"""
+    return text.strip().lower()
+
+def read_sample(lines: Iterable[str]) -> List[Tuple[str, Optional[str]]]:
+    """(guess, word) pairs from text or JSONL lines; word is None for plain text"""
+    sample = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("{"):
+            record = json.loads(line)
+            sample.append((str(record["guess"]), record.get("word")))
+        else:
+            sample.append((line, None))
+    return sample
+
+def build_report(sample: List[Tuple[str, Optional[str]]], top: int) -> Dict[str, object]:
+    before: Set[str] = set()
+    after: Set[str] = set()
+    merged: Dict[str, Set[str]] = defaultdict(set)
+    hits: Counter = Counter()
+    pairs_before: Set[Tuple[str, str]] = set()
+    pairs_after: Set[Tuple[str, str]] = set()
+
+    for guess, word in sample:
+        canonical = canonicalize(guess)
+        before.add(legacy_key(guess))
+        after.add(canonical)
+        merged[canonical].add(legacy_key(guess))
+        hits[canonical] += 1
+        if word is not None:
+            pairs_before.add((legacy_key(guess), legacy_key(word)))
+            pairs_after.add((canonical, canonicalize(word)))
+
+    groups = sorted(
+        ((canonical, sorted(variants)) for canonical, variants in merged.items() if len(variants) > 1),
+        key=lambda group: (-hits[group[0]], group[0])
+    )
+    report = {
+        "inputs": len(sample),
+        "distinct_before": len(before),
+        "distinct_after": len(after),
+        "reduction": round(1 - len(after) / len(before), 4) if before else 0.0,
+        "merged_groups": [{"canonical": canonical, "variants": variants, "inputs": hits[canonical]} for canonical, variants in groups[:top]],
+    }
+    if pairs_before:
+        report["cache_keys_before"] = len(pairs_before)
+        report["cache_keys_after"] = len(pairs_after)
+        report["cache_key_reduction"] = round(1 - len(pairs_after) / len(pairs_before), 4)
+    return report
+
+def print_report(report: Dict[str, object]) -> None:
+    print(f"inputs:            {report['inputs']}")
+    print(f"distinct guesses:  {report['distinct_before']} -> {report['distinct_after']} ({report['reduction']:.1%} fewer)")
+    if "cache_keys_before" in report:
+        print(f"verdict keys:      {report['cache_keys_before']} -> {report['cache_keys_after']} ({report['cache_key_reduction']:.1%} fewer)")
+    if report["merged_groups"]:
+        print("most common merges:")
+        for group in report["merged_groups"]:
+            print(f"  {group['canonical']!r} <- {', '.join(repr(v) for v in group['variants'])} ({group['inputs']} inputs)")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure how canonicalization reduces distinct guesses and cache keys")
+    parser.add_argument("sample", help="Text file with one guess per line, or JSONL with guess/word fields ('-' for stdin)")
+    parser.add_argument("--top", type=int, default=10, help="Merged groups to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.sample == "-":
+        sample = read_sample(sys.stdin)
+    else:
+        with open(args.sample, encoding="utf-8") as f:
+            sample = read_sample(f)
+
+    report = build_report(sample, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
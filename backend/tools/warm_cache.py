@@ -0,0 +1,199 @@
+
+"""
+Warm the verdict cache before shifting traffic to a new deployment or after a Redis flush.
+
+Pairs come from the most guessed words in `global_counters` (every ordered pair of the
+top words), consecutive guesses of recent chains in `game_sessions`, and optionally a
+JSONL file with "guess" and "word" fields. Pairs already cached are skipped; the rest go
+through the normal lookup path (verdict store, then Gemini) at a controlled rate.
+Completed pairs are appended to a checkpoint file, so an interrupted run resumes where
+it stopped.
+
+    python -m backend.tools.warm_cache --top-words 50 --sessions 1000 --rate 5 --concurrency 4
+    python -m backend.tools.warm_cache --pairs pairs.jsonl --checkpoint warm.done
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend.core.cache import make_cache_key, get_cache_many, init_redis_pool, close_redis_pool
+from backend.core.canonical import canonicalize
+from backend.core.game_logic import get_verdict
+from backend.db import models
+
+Pair = Tuple[str, str]
+
+async def top_word_pairs(database, limit: int) -> List[Pair]:
+    """Every ordered pair of the `limit` most guessed words"""
+    if limit <= 0:
+        return []
+    cursor = database.global_counters.find({}, {"_id": 0, "word": 1}).sort("count", -1).limit(limit)
+    words = [doc["word"] for doc in await cursor.to_list(length=limit)]
+    return [(guess, word) for word in words for guess in words if guess != word]
+
+async def session_pairs(database, limit: int) -> List[Pair]:
+    """(guess, previous word) for consecutive guesses of the `limit` most recent sessions"""
+    if limit <= 0:
+        return []
+    cursor = database.game_sessions.find({}, {"_id": 0, "guesses": 1}).sort("_id", -1).limit(limit)
+    pairs = []
+    for doc in await cursor.to_list(length=limit):
+        chain = doc.get("guesses", [])
+        pairs.extend((chain[i + 1], chain[i]) for i in range(len(chain) - 1))
+    return pairs
+
+def file_pairs(path: Optional[str]) -> List[Pair]:
+    if not path:
+        return []
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                pairs.append((str(record["guess"]), str(record["word"])))
+    return pairs
+
+def dedupe(pairs: List[Pair]) -> List[Pair]:
+    """Canonical pairs in first-seen order, one per cache key"""
+    seen: Set[str] = set()
+    unique = []
+    for guess, word in pairs:
+        guess, word = canonicalize(guess), canonicalize(word)
+        key = make_cache_key(guess, word)
+        if guess and word and guess != word and key not in seen:
+            seen.add(key)
+            unique.append((guess, word))
+    return unique
+
+def read_checkpoint(path: Optional[str]) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+class Progress:
+    """Counts by outcome, printed every `every` seconds"""
+
+    def __init__(self, total: int, every: float):
+        self.total = total
+        self.every = every
+        self.counts: Dict[str, int] = {"warmed": 0, "cached": 0, "failed": 0, "resumed": 0}
+        self.started = time.monotonic()
+        self._printed = self.started
+
+    def add(self, outcome: str) -> None:
+        self.counts[outcome] += 1
+        now = time.monotonic()
+        if now - self._printed >= self.every:
+            self._printed = now
+            self.report()
+
+    def report(self) -> None:
+        done = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started
+        rate = self.counts["warmed"] / elapsed if elapsed else 0.0
+        outcomes = ", ".join(f"{name} {count}" for name, count in self.counts.items())
+        print(f"{done}/{self.total} pairs ({outcomes}), {rate:.1f} warmed/s, {elapsed:.0f}s", flush=True)
+
+async def warm(pairs: List[Pair], redis_client, rate: float, concurrency: int,
+               checkpoint: Optional[str], report_every: float) -> Dict[str, int]:
+    """Look up every pair that isn't cached yet, at most `rate` per second and `concurrency` at once"""
+    done = read_checkpoint(checkpoint)
+    progress = Progress(len(pairs), report_every)
+    todo = []
+    for pair in pairs:
+        if make_cache_key(*pair) in done:
+            progress.add("resumed")
+        else:
+            todo.append(pair)
+
+    # Skip what's already cached, with one Redis round-trip per chunk
+    misses = []
+    for start in range(0, len(todo), 500):
+        chunk = todo[start:start + 500]
+        cached = await get_cache_many(redis_client, [make_cache_key(*pair) for pair in chunk])
+        for pair, value in zip(chunk, cached):
+            if value is None:
+                misses.append(pair)
+            else:
+                progress.add("cached")
+
+    checkpoint_file = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    queue: "asyncio.Queue[Pair]" = asyncio.Queue()
+    for pair in misses:
+        queue.put_nowait(pair)
+
+    interval = 1 / rate if rate > 0 else 0.0
+    next_start = time.monotonic()
+    pace = asyncio.Lock()
+
+    async def worker() -> None:
+        nonlocal next_start
+        while not queue.empty():
+            guess, word = queue.get_nowait()
+            async with pace:
+                delay = next_start - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_start = max(next_start, time.monotonic()) + interval
+
+            verdict = await get_verdict(guess, word)
+            if verdict.get("error"):
+                # Not recorded, so the next run retries it
+                progress.add("failed")
+                continue
+            progress.add("warmed")
+            if checkpoint_file is not None:
+                checkpoint_file.write(make_cache_key(guess, word) + "\n")
+                checkpoint_file.flush()
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    finally:
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+        progress.report()
+    return progress.counts
+
+async def run(args: argparse.Namespace) -> int:
+    # Import here to avoid loading the app for --help
+    from backend.main import app
+
+    await models.init_db()
+    redis_client = await init_redis_pool()
+    app.state.redis = redis_client
+    try:
+        pairs = dedupe(
+            await top_word_pairs(models.db, args.top_words)
+            + await session_pairs(models.db, args.sessions)
+            + file_pairs(args.pairs)
+        )
+        print(f"{len(pairs)} distinct pairs to warm", flush=True)
+        if args.dry_run:
+            return 0
+
+        counts = await warm(pairs, redis_client, args.rate, args.concurrency, args.checkpoint, args.report_every)
+        return 1 if counts["failed"] else 0
+    finally:
+        await close_redis_pool(redis_client)
+        models.close_db()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fill the verdict cache from historical traffic")
+    parser.add_argument("--top-words", type=int, default=30, help="Pair up this many of the most guessed words")
+    parser.add_argument("--sessions", type=int, default=1000, help="Most recent session chains to take pairs from")
+    parser.add_argument("--pairs", help="JSONL file with guess/word pairs to warm as well")
+    parser.add_argument("--rate", type=float, default=5.0, help="Most uncached pairs started per second (0 for no limit)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Most uncached pairs looked up at once")
+    parser.add_argument("--checkpoint", help="File of completed pairs, appended to as they finish and skipped on the next run")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the pairs")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,403 @@
+
+"""
+Local stand-ins for the game's external services, so the real FastAPI app can be
+benchmarked without Gemini, MongoDB or Redis:
+
+- FakeJudge: answers the judge prompts (single and batched) with configurable latency and errors
+- InMemoryDatabase: the subset of Motor's async collection API that backend.db.models uses
+- fake_redis(): a fakeredis client with Lua support, standing in for the Redis pool
+"""
+
+import asyncio
+import copy
+import json
+import random
+import re
+import uuid
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class FakeJudgeError(Exception):
+    pass
+
+class FakeJudge:
+    """Deterministic stand-in for the Gemini model call"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0,
+                 valid_rate: float = 0.85, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.valid_rate = valid_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.pairs = 0
+        self.errors = 0
+
+    def is_valid(self, guess: str, word: str) -> bool:
+        """The same pair always gets the same verdict"""
+        return zlib.crc32(f"{guess}>{word}".encode()) % 1000 < self.valid_rate * 1000
+
+    def _verdict(self, guess: str, word: str) -> Dict[str, Any]:
+        valid = self.is_valid(guess, word)
+        return {"valid": valid, "explanation": f"{guess} {'beats' if valid else 'does not beat'} {word}"}
+
+    async def __call__(self, content: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)))
+
+        if self._random.random() < self.error_rate:
+            self.errors += 1
+            raise FakeJudgeError("simulated upstream error")
+
+        # Batched prompt: "1. Guess (X): a | Word (Y): b"
+        batch = re.findall(r"^(\d+)\. Guess \(X\): (.*) \| Word \(Y\): (.*)$", content, re.MULTILINE)
+        if batch:
+            self.pairs += len(batch)
+            return json.dumps([{"index": int(index), **self._verdict(guess, word)} for index, guess, word in batch])
+
+        guess = re.search(r"^Guess \(X\): (.*)$", content, re.MULTILINE)
+        word = re.search(r"^Word \(Y\): (.*)$", content, re.MULTILINE)
+        if guess and word:
+            self.pairs += 1
+            if "Explanation:" in content:
+                # Persona rephrasing call
+                return f"WOW! {guess.group(1)} vs {word.group(1)}! 🎉"
+            return json.dumps(self._verdict(guess.group(1), word.group(1)))
+
+        return "{}"
+
+def fake_redis():
+    """A fakeredis client configured like init_redis_pool's"""
+    import fakeredis
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+# --- In-memory MongoDB -------------------------------------------------------
+
+_MISSING = object()
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    if isinstance(doc, list) and parts[-1].isdigit():
+        # Setting past the end pads with nulls, as in MongoDB
+        index = int(parts[-1])
+        doc.extend([None] * (index + 1 - len(doc)))
+        doc[index] = value
+    else:
+        doc[parts[-1]] = value
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part, {})
+    doc.pop(parts[-1], None)
+
+def _equals(value: Any, expected: Any) -> bool:
+    # Arrays match if they equal the value or contain it, as in MongoDB
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {
+            "$gt": value > operand,
+            "$gte": value >= operand,
+            "$lt": value < operand,
+            "$lte": value <= operand,
+        }[operator]
+    except TypeError:
+        return False
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, operand in condition.items():
+            if operator == "$eq" and not _equals(value, operand):
+                return False
+            elif operator == "$ne" and value is not _MISSING and _equals(value, operand):
+                return False
+            elif operator == "$in" and not any(value is not _MISSING and _equals(value, item) for item in operand):
+                return False
+            elif operator == "$nin" and any(value is not _MISSING and _equals(value, item) for item in operand):
+                return False
+            elif operator == "$exists" and (value is not _MISSING) != bool(operand):
+                return False
+            elif operator in ("$gt", "$gte", "$lt", "$lte") and not _compare(value, operator, operand):
+                return False
+        return True
+
+    if value is _MISSING:
+        return condition is None
+    return _equals(value, condition)
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a MongoDB query filter against a document"""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif not _matches_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    """Apply MongoDB update operators to a document in place"""
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            current = _get_path(doc, path)
+            if operator == "$set":
+                _set_path(doc, path, copy.deepcopy(value))
+            elif operator == "$setOnInsert":
+                if inserting:
+                    _set_path(doc, path, copy.deepcopy(value))
+            elif operator == "$unset":
+                _unset_path(doc, path)
+            elif operator == "$inc":
+                _set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif operator == "$max":
+                if current is _MISSING or value > current:
+                    _set_path(doc, path, value)
+            elif operator == "$min":
+                if current is _MISSING or value < current:
+                    _set_path(doc, path, value)
+            elif operator == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                _set_path(doc, path, ([] if current is _MISSING else list(current)) + copy.deepcopy(items))
+            elif operator == "$addToSet":
+                existing = [] if current is _MISSING else list(current)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                _set_path(doc, path, existing + [item for item in items if item not in existing])
+            else:
+                raise NotImplementedError(f"Update operator {operator} is not supported")
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply an inclusion/exclusion projection (with $slice) to a document"""
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+
+    slices = {key: value["$slice"] for key, value in projection.items() if isinstance(value, dict) and "$slice" in value}
+    plain = {key: value for key, value in projection.items() if key not in slices}
+    include_id = plain.pop("_id", 1)
+
+    if any(plain.values()):
+        result = {key: doc[key] for key in list(plain) + list(slices) if key in doc}
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+    else:
+        result = {key: value for key, value in doc.items() if key not in plain}
+        if not include_id:
+            result.pop("_id", None)
+
+    for key, spec in slices.items():
+        if isinstance(result.get(key), list):
+            items = result[key]
+            if isinstance(spec, list):
+                skip, limit = spec
+                start = skip if skip >= 0 else max(len(items) + skip, 0)
+                result[key] = items[start:start + limit]
+            elif spec >= 0:
+                result[key] = items[:spec]
+            else:
+                result[key] = items[spec:]
+    return result
+
+def _sort_key(doc: Dict[str, Any], field: str) -> Tuple[bool, Any]:
+    value = _get_path(doc, field)
+    return (value is _MISSING, 0 if value is _MISSING else value)
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+class InMemoryCursor:
+    """Async cursor over a snapshot of matching documents"""
+
+    def __init__(self, docs: List[Dict[str, Any]], projection: Optional[Dict[str, Any]]):
+        self._docs = docs
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1) -> "InMemoryCursor":
+        keys = key if isinstance(key, list) else [(key, direction)]
+        # Stable sorts applied from the last key to the first give a multi-key sort
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda doc: _sort_key(doc, field), reverse=order < 0)
+        return self
+
+    def skip(self, count: int) -> "InMemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> "InMemoryCursor":
+        return self
+
+    def _selected(self) -> List[Dict[str, Any]]:
+        docs = self._docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(doc, self._projection) for doc in docs]
+
+    def __aiter__(self):
+        self._iterator = iter(self._selected())
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = self._selected()
+        return docs[:length] if length else docs
+
+class InMemoryCollection:
+    """The subset of Motor's AsyncIOMotorCollection used by the game"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[Dict[str, Any]] = []
+        self.indexes: List[Tuple[Any, Dict[str, Any]]] = []
+        self.operations = 0
+
+    async def create_index(self, keys, **kwargs) -> str:
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name", str(keys))
+
+    def _find(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.operations += 1
+        return [doc for doc in self._docs if matches(doc, query)]
+
+    async def insert_one(self, doc: Dict[str, Any]) -> _Result:
+        doc.setdefault("_id", uuid.uuid4().hex)
+        self._docs.append(copy.deepcopy(doc))
+        self.operations += 1
+        return _Result(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs: Iterable[Dict[str, Any]], ordered: bool = True) -> _Result:
+        ids = [(await self.insert_one(doc)).inserted_id for doc in docs]
+        return _Result(inserted_ids=ids)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                       sort=None, **kwargs) -> Optional[Dict[str, Any]]:
+        cursor = InMemoryCursor(self._find(query), projection)
+        if sort:
+            cursor.sort(sort)
+        docs = await cursor.limit(1).to_list()
+        return docs[0] if docs else None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs) -> InMemoryCursor:
+        return InMemoryCursor(self._find(query), projection)
+
+    async def count_documents(self, query: Optional[Dict[str, Any]] = None, **kwargs) -> int:
+        return len(self._find(query))
+
+    def _upsert(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        doc = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+        doc["_id"] = uuid.uuid4().hex
+        apply_update(doc, update, inserting=True)
+        self._docs.append(doc)
+        return doc
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> _Result:
+        found = self._find(query)
+        if found:
+            apply_update(found[0], update)
+            return _Result(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return _Result(matched_count=0, modified_count=0, upserted_id=self._upsert(query, update)["_id"])
+        return _Result(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> _Result:
+        found = self._find(query)
+        for doc in found:
+            apply_update(doc, update)
+        return _Result(matched_count=len(found), modified_count=len(found), upserted_id=None)
+
+    async def find_one_and_update(self, query: Dict[str, Any], update: Dict[str, Any], projection=None,
+                                  upsert: bool = False, return_document: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        found = self._find(query)
+        if found:
+            before = copy.deepcopy(found[0])
+            apply_update(found[0], update)
+            return project(found[0] if return_document else before, projection)
+        if upsert:
+            doc = self._upsert(query, update)
+            return project(doc, projection) if return_document else None
+        return None
+
+    async def replace_one(self, query: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> _Result:
+        found = self._find(query)
+        if found:
+            self._docs[self._docs.index(found[0])] = {"_id": found[0]["_id"], **copy.deepcopy(replacement)}
+            return _Result(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return _Result(matched_count=0, modified_count=0, upserted_id=self._upsert(query, {"$set": replacement})["_id"])
+        return _Result(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> _Result:
+        # pymongo's UpdateOne and ReplaceOne keep their arguments in private attributes
+        for request in requests:
+            if any(key.startswith("$") for key in request._doc):
+                await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            else:
+                await self.replace_one(request._filter, request._doc, upsert=request._upsert)
+        return _Result(modified_count=len(requests))
+
+    async def delete_one(self, query: Dict[str, Any]) -> _Result:
+        found = self._find(query)
+        if found:
+            self._docs.remove(found[0])
+        return _Result(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query: Dict[str, Any]) -> _Result:
+        found = self._find(query)
+        ids = {id(doc) for doc in found}
+        self._docs = [doc for doc in self._docs if id(doc) not in ids]
+        return _Result(deleted_count=len(found))
+
+class InMemoryDatabase:
+    """Collections are created on first access, like a Motor database"""
+
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, command: str, *args, **kwargs) -> Dict[str, Any]:
+        return {"ok": 1}
+
+    def operations(self) -> int:
+        return sum(collection.operations for collection in self._collections.values())
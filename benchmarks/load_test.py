@@ -0,0 +1,287 @@
+
+"""
+End-to-end load test for the game API.
+
+Runs the real FastAPI app in-process against local stand-ins for Gemini, MongoDB and
+Redis (see benchmarks/fakes.py) and drives realistic game traffic: players start games,
+build chains of guesses and sometimes repeat a word. Reports throughput and p50/p95/p99
+latency for each concurrency level.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.load_test --concurrency 1,10,50 --requests 2000
+    python -m benchmarks.load_test --save bench.json
+    python -m benchmarks.load_test --baseline bench.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import FakeJudge, InMemoryDatabase, fake_redis
+
+VOCABULARY = [
+    "paper", "scissors", "rock", "fire", "water", "wind", "earth", "lightning", "tree", "axe",
+    "sword", "shield", "dragon", "knight", "castle", "cannon", "wall", "ladder", "rope", "knife",
+    "lion", "mouse", "cat", "dog", "elephant", "ant", "eagle", "snake", "mongoose", "shark",
+    "boat", "storm", "sun", "cloud", "umbrella", "rain", "drought", "ice", "lava", "volcano",
+    "ocean", "sponge", "soap", "dirt", "vacuum", "robot", "virus", "vaccine", "doctor", "time",
+    "love", "hate", "money", "tax", "lawyer", "judge", "prison", "key", "lock", "hammer",
+    "nail", "glass", "diamond", "laser", "mirror", "vampire", "garlic", "werewolf", "silver", "gold",
+    "rust", "oil", "match", "candle", "darkness", "light", "black hole", "star", "planet", "comet",
+    "dinosaur", "meteor", "bacteria", "bleach", "tsunami", "mountain", "tunnel", "drill", "magnet", "compass",
+]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class Stats:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.failures: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+
+    def outcome(self, name: str) -> None:
+        self.outcomes[name] = self.outcomes.get(name, 0) + 1
+
+    @staticmethod
+    def summarize(latencies: List[float]) -> Dict[str, float]:
+        ordered = sorted(latencies)
+        return {
+            "count": len(ordered),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        }
+
+class Budget:
+    """Shared count of requests left to send"""
+
+    def __init__(self, total: int):
+        self.remaining = total
+
+    def take(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+async def _timed(client: httpx.AsyncClient, stats: Stats, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception as e:
+        stats.record(endpoint, time.perf_counter() - start, False)
+        print(f"{endpoint} failed: {e}", file=sys.stderr)
+        return None
+    stats.record(endpoint, time.perf_counter() - start, response.status_code == 200)
+    return response
+
+async def play(client: httpx.AsyncClient, stats: Stats, budget: Budget, rng: random.Random,
+               chain_length: int, duplicate_rate: float, personas: List[str]) -> None:
+    """One player: start games and guess along a chain until the budget runs out"""
+    while budget.take():
+        response = await _timed(client, stats, "new-game", "POST", "/api/new-game",
+                                params={"seed_word": rng.choice(VOCABULARY)})
+        if response is None or response.status_code != 200:
+            continue
+
+        game = response.json()
+        session_id = game["session_id"]
+        chain = [game["current_word"]]
+        persona = rng.choice(personas)
+
+        for _ in range(chain_length):
+            if not budget.take():
+                return
+
+            if len(chain) > 1 and rng.random() < duplicate_rate:
+                guess = rng.choice(chain)
+            else:
+                guess = rng.choice([word for word in VOCABULARY if word not in chain] or VOCABULARY)
+
+            response = await _timed(client, stats, "guess", "POST", "/api/guess",
+                                    json={"guess": guess, "session_id": session_id},
+                                    headers={"persona": persona})
+            if response is None or response.status_code != 200:
+                stats.outcome("error")
+                continue
+
+            result = response.json()
+            if result["valid"]:
+                stats.outcome("accepted")
+                chain.append(result["current_word"])
+            elif "Game Over" in result["message"]:
+                stats.outcome("game_over")
+                break
+            else:
+                stats.outcome("rejected")
+
+class Environment:
+    """Points the app at fresh stand-ins and restores it afterwards"""
+
+    def __init__(self, judge: FakeJudge, rate_limits: bool):
+        self.judge = judge
+        self.rate_limits = rate_limits
+
+    async def __aenter__(self) -> "Environment":
+        from backend.main import app
+        from backend.core import ai_client, cache
+        from backend.core.leaderboard import leaderboard
+        from backend.db import models
+
+        self.app = app
+        self.db = InMemoryDatabase()
+        self.redis = fake_redis()
+
+        models.db = self.db
+        models.counters.reset()
+        models.counters.start()
+        models.session_store.attach(self.redis)
+        leaderboard.attach(self.redis)
+        app.state.redis = self.redis
+        cache.local_cache.clear()
+        ai_client.set_generator(self.judge)
+
+        self._saved_limits = dict(cache.RATE_LIMITS)
+        if not self.rate_limits:
+            cache.RATE_LIMITS.clear()
+
+        self._listener = asyncio.create_task(cache.listen_for_invalidations(self.redis))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        from backend.core import ai_client, cache
+        from backend.db import models
+
+        self._listener.cancel()
+        await models.counters.stop()
+        await models.session_store.flush()
+        ai_client.set_generator(None)
+        cache.RATE_LIMITS.clear()
+        cache.RATE_LIMITS.update(self._saved_limits)
+        await self.redis.aclose()
+
+async def run_level(concurrency: int, total_requests: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one concurrency level against a fresh environment"""
+    judge = FakeJudge(latency=args.ai_latency, jitter=args.ai_jitter, error_rate=args.ai_error_rate, seed=args.seed)
+    stats = Stats()
+    budget = Budget(total_requests)
+
+    async with Environment(judge, args.rate_limits) as env:
+        clients = [
+            # Each player gets its own client address, as the rate limiter keys on it
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=env.app, client=(f"10.0.{i // 250}.{i % 250 + 1}", 50000)),
+                base_url="http://loadtest"
+            )
+            for i in range(concurrency)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            play(client, stats, budget, random.Random(args.seed + i), args.chain_length,
+                 args.duplicate_rate, args.personas.split(","))
+            for i, client in enumerate(clients)
+        ])
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            await client.aclose()
+        mongo_operations = env.db.operations()
+
+    all_latencies = [latency for latencies in stats.latencies.values() for latency in latencies]
+    return {
+        "concurrency": concurrency,
+        "requests": len(all_latencies),
+        "failures": sum(stats.failures.values()),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1) if elapsed else 0.0,
+        **Stats.summarize(all_latencies),
+        "endpoints": {endpoint: Stats.summarize(latencies) for endpoint, latencies in stats.latencies.items()},
+        "outcomes": stats.outcomes,
+        "ai_calls": judge.calls,
+        "ai_pairs": judge.pairs,
+        "ai_errors": judge.errors,
+        "mongo_operations": mongo_operations,
+    }
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    header = f"{'conc':>5} {'reqs':>7} {'fail':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ai calls':>9} {'mongo ops':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['requests']:>7} {r['failures']:>5} {r['throughput_rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['ai_calls']:>9} {r['mongo_operations']:>10}")
+    for r in results:
+        endpoints = ", ".join(f"{name} p95={summary['p95_ms']}ms" for name, summary in r["endpoints"].items())
+        print(f"  c={r['concurrency']}: {endpoints}; outcomes {r['outcomes']}")
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], max_regression: float) -> List[str]:
+    """Describe every level whose p95 or throughput got worse than the baseline by more than max_regression"""
+    problems = []
+    previous = {r["concurrency"]: r for r in baseline}
+    for r in results:
+        before = previous.get(r["concurrency"])
+        if before is None:
+            continue
+        if before["p95_ms"] and r["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            problems.append(f"c={r['concurrency']}: p95 {before['p95_ms']}ms -> {r['p95_ms']}ms")
+        if r["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            problems.append(f"c={r['concurrency']}: throughput {before['throughput_rps']} -> {r['throughput_rps']} rps")
+    return problems
+
+async def main(args: argparse.Namespace) -> int:
+    results = []
+    for concurrency in [int(level) for level in args.concurrency.split(",")]:
+        results.append(await run_level(concurrency, args.requests, args))
+
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            return 1
+    return 0
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the game API against local stand-ins")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated numbers of concurrent players")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+    parser.add_argument("--chain-length", type=int, default=15, help="Most guesses per game")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Chance a guess repeats the chain")
+    parser.add_argument("--personas", default="serious,cheery")
+    parser.add_argument("--ai-latency", type=float, default=0.05, help="Mean fake model latency in seconds")
+    parser.add_argument("--ai-jitter", type=float, default=0.02)
+    parser.add_argument("--ai-error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the configured rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed fractional regression vs baseline")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -4,6 +4,10 @@ let sessionId = null;
 let currentWord = null;
 let score = 0;
 
+// WebSocket channel for the current game, used when available (otherwise guesses use fetch)
+let socket = null;
+let pendingReplies = [];
+
 // DOM elements
 const seedWordInput = document.getElementById('seed-word');
 const startGameButton = document.getElementById('start-game');
@@ -62,6 +66,7 @@ async function startNewGame() {
         sessionId = data.session_id;
         currentWord = data.current_word;
         score = 0;
+        openGameChannel();
         
         // Update UI
         currentWordDisplay.textContent = currentWord;
@@ -97,24 +102,13 @@ async function submitGuess() {
     }
     
     try {
-        const response = await fetch('/api/guess', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'persona': personaSelector.value,
-            },
-            body: JSON.stringify({
-                guess: guess,
-                session_id: sessionId,
-            }),
-        });
+        const data = await sendGuess(guess);
         
-        if (!response.ok) {
-            throw new Error(`HTTP error ${response.status}`);
+        if (data.type === 'error') {
+            showMessage(data.message, false);
+            return;
         }
         
-        const data = await response.json();
-        
         // Update UI based on response
         if (data.valid) {
             // Success - update the game state
@@ -157,6 +151,81 @@ async function submitGuess() {
     }
 }
 
+function openGameChannel() {
+    if (socket) {
+        socket.close();
+        socket = null;
+    }
+    if (!('WebSocket' in window)) {
+        return;
+    }
+    
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const persona = encodeURIComponent(personaSelector.value);
+    const channel = new WebSocket(`${protocol}//${window.location.host}/api/ws/${sessionId}?persona=${persona}`);
+    
+    channel.addEventListener('open', () => {
+        socket = channel;
+    });
+    
+    channel.addEventListener('message', (event) => {
+        const data = JSON.parse(event.data);
+        
+        // State updates aren't replies: the first one on connect, or after the game changed elsewhere
+        if (data.type === 'state') {
+            if (data.message) {
+                currentWord = data.current_word;
+                score = data.score;
+                currentWordDisplay.textContent = currentWord;
+                scoreElement.textContent = score;
+                updateGuessesList(data.previous_guesses);
+                showMessage(data.message, false);
+            }
+            return;
+        }
+        
+        const reply = pendingReplies.shift();
+        if (reply) {
+            reply.resolve(data);
+        }
+    });
+    
+    channel.addEventListener('close', () => {
+        if (socket === channel) {
+            socket = null;
+        }
+        pendingReplies.forEach(reply => reply.reject(new Error('Connection closed')));
+        pendingReplies = [];
+    });
+}
+
+async function sendGuess(guess) {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        return new Promise((resolve, reject) => {
+            pendingReplies.push({ resolve, reject });
+            socket.send(JSON.stringify({ guess: guess, persona: personaSelector.value }));
+        });
+    }
+    
+    const response = await fetch('/api/guess', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'persona': personaSelector.value,
+        },
+        body: JSON.stringify({
+            guess: guess,
+            session_id: sessionId,
+        }),
+    });
+    
+    if (!response.ok) {
+        throw new Error(`HTTP error ${response.status}`);
+    }
+    
+    return response.json();
+}
+
 function updateGuessesList(guesses) {
     guessesList.innerHTML = '';
     
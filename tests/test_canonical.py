@@ -0,0 +1,58 @@
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.canonical import canonicalize
+from backend.core.cache import make_cache_key
+from backend.core.moderation import check_content, check_guess, check_guesses
+from backend.tools.canonical_report import build_report, read_sample
+
+def test_variants_share_one_form():
+    for variant in ["Papers", "paper ", "PAPER!", "the paper", "  The   Papers!! ", "Ｐａｐｅｒ"]:
+        assert canonicalize(variant) == "paper"
+
+def test_singularization_is_conservative():
+    assert canonicalize("scissors") == "scissors"
+    assert canonicalize("glass") == "glass"
+    assert canonicalize("boxes") == "box"
+    assert canonicalize("batteries") == "battery"
+    assert canonicalize("zombies") == "zombie"
+    assert canonicalize("black holes") == "black hole"
+    assert canonicalize("shoes") == "shoe"
+    assert canonicalize("houses") == "house"
+    for word in ["volcanoes", "potatoes", "knives", "buses", "ethics", "hercules", "thanos", "athens", "james"]:
+        assert canonicalize(word) == word
+
+def test_articles_and_punctuation():
+    assert canonicalize("an apple") == "apple"
+    assert canonicalize("a") == "a"
+    assert canonicalize("rock-n-roll") == "rock n roll"
+    assert canonicalize("!!!") == "!!!"
+    assert canonicalize("Newton's cradle") == "newtons cradle"
+    assert canonicalize("don\u2019t") == "dont"
+
+def test_idempotent():
+    for text in ["The Papers!", "flies", "classes", "the the rock", "Mr. Bubbles", "wolves", "Newton's cradles"]:
+        assert canonicalize(canonicalize(text)) == canonicalize(text)
+
+def test_moderation_covers_canonical_form():
+    # Allowed as typed, blocked once canonicalized
+    for text in ["hurts", "kills", "injures", "slurs", "the slur!"]:
+        assert not check_content(text)
+        assert check_content(canonicalize(text))
+        assert check_guess(text)
+    assert check_guesses(["kills", "papers", "rock"]) == [True, False, False]
+
+def test_cache_key_uses_canonical_form():
+    assert make_cache_key("The Papers!", "ROCK") == make_cache_key("paper", "rock") == "verdict:paper:rock"
+
+def test_report_counts_merges():
+    sample = read_sample(["Papers\n", "paper\n", '{"guess": "PAPER!", "word": "rock"}\n', '{"guess": "paper", "word": "Rocks"}\n', "fire\n"])
+    report = build_report(sample, top=5)
+    assert report["distinct_before"] == 4
+    assert report["distinct_after"] == 2
+    assert report["cache_keys_before"] == 2
+    assert report["cache_keys_after"] == 1
+    assert report["merged_groups"][0]["canonical"] == "paper"
@@ -0,0 +1,21 @@
+
+import sys
+import os
+import asyncio
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("fakeredis")
+
+from benchmarks.load_test import parse_args, run_level
+
+def test_load_harness_smoke():
+    """A short run through the real app against the local stand-ins completes without failures"""
+    args = parse_args(["--requests", "60", "--ai-latency", "0.001", "--ai-jitter", "0"])
+    result = asyncio.run(run_level(5, args.requests, args))
+    
+    assert result["requests"] == 60
+    assert result["failures"] == 0
+    assert result["outcomes"].get("accepted", 0) > 0
+    assert result["ai_calls"] > 0
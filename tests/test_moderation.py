@@ -0,0 +1,40 @@
+
+import sys
+import os
+import re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.moderation import check_content, check_contents, DISALLOWED_WORDS, DANGEROUS_PATTERNS, profanity
+
+def legacy_check_content(text):
+    """The original multi-pass implementation, kept to prove the decisions are unchanged"""
+    if not text or not isinstance(text, str):
+        return False
+    text_lower = text.lower()
+    if profanity.contains_profanity(text):
+        return True
+    for word in DISALLOWED_WORDS:
+        if word in text_lower.split():
+            return True
+    for pattern in DANGEROUS_PATTERNS:
+        if re.search(pattern, text_lower):
+            return True
+    return False
+
+SAMPLES = [
+    "", None, 42, "rock", "paper", "Scissors", "kill", "KILLING spree", "skill", "killer whale",
+    "overkill", "harm", "pharmacy", "unharmed", "hurt", "hurts", "hurting", "injured", "injure\n",
+    "slur", "slurp", "a slur here", "Explicit", "explicitly", "offensive line", "  offensive  ",
+    "shit", "sh1t", "damn it", "bullshit", "ass", "class", "passage", "fire\tslur", "water",
+]
+
+def test_decisions_match_legacy():
+    """Every sample gets the same blocking decision as the legacy implementation"""
+    for text in SAMPLES:
+        assert check_content(text) == legacy_check_content(text), text
+
+def test_batch_matches_single():
+    """The batch API returns one decision per input, in order"""
+    texts = [text for text in SAMPLES if isinstance(text, str)]
+    assert check_contents(texts) == [check_content(text) for text in texts]
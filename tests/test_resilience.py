@@ -0,0 +1,68 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.resilience import CircuitBreaker, hedged
+
+def make_call(log):
+    async def call():
+        log.append("started")
+        try:
+            await asyncio.sleep(1)
+            return "answer"
+        finally:
+            log.append("stopped")
+    return call
+
+def test_hedge_wins_and_loser_is_cancelled():
+    log = []
+    async def fast():
+        return "hedge"
+
+    async def main():
+        result = await hedged(make_call(log), 0.05, hedge_call=fast)
+        await asyncio.sleep(0)
+        return result, list(log)
+
+    assert asyncio.run(main()) == ("hedge", ["started", "stopped"])
+
+def test_cancelled_caller_cancels_attempts():
+    for delay in (None, 1.0):
+        log = []
+
+        async def main():
+            task = asyncio.ensure_future(hedged(make_call(log), delay))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            await asyncio.sleep(0)
+            # Checked before asyncio.run cancels whatever is left
+            return list(log)
+
+        assert asyncio.run(main()) == ["started", "stopped"], delay
+
+def test_timed_out_caller_cancels_attempts():
+    log = []
+
+    async def main():
+        try:
+            await asyncio.wait_for(hedged(make_call(log), 1.0), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0)
+        return list(log)
+
+    assert asyncio.run(main()) == ["started", "stopped"]
+
+def test_released_trial_lets_the_next_call_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
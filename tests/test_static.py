@@ -0,0 +1,60 @@
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.static import StaticAssetsMiddleware, build_assets, hashed_name
+
+def make_client(tmp_path):
+    (tmp_path / "index.html").write_text('<link rel="stylesheet" href="styles.css"><script src="app.js"></script>')
+    (tmp_path / "app.js").write_text("console.log('rock');\n" * 50)
+    (tmp_path / "styles.css").write_text("body { color: red; }\n")
+
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.add_middleware(StaticAssetsMiddleware, directory=str(tmp_path))
+    return TestClient(app)
+
+def test_index_references_hashed_assets(tmp_path):
+    client = make_client(tmp_path)
+    assets = build_assets(str(tmp_path))
+    script = hashed_name("app.js", assets["/app.js"].digest)
+
+    response = client.get("/")
+    assert f'src="{script}"' in response.text
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get(f"/{script}")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+
+def test_gzip_and_not_modified(tmp_path):
+    client = make_client(tmp_path)
+
+    response = client.get("/app.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text.startswith("console.log")
+    etag = response.headers["etag"]
+
+    response = client.get("/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # A different representation has its own ETag
+    response = client.get("/app.js", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content == (tmp_path / "app.js").read_bytes()
+
+def test_other_paths_reach_the_app(tmp_path):
+    client = make_client(tmp_path)
+    assert client.get("/api/ping").json() == {"ok": True}
+    assert client.get("/missing.js").status_code == 404